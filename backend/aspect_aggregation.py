@@ -0,0 +1,240 @@
+# backend/aspect_aggregation.py
+# Bounded-memory aggregation of aspects over a stream of reviews
+
+import heapq
+import random
+from collections import Counter
+
+
+class StreamingTopK:
+    """
+    Weighted heavy hitters over a stream (Space-Saving)
+
+    At most `capacity` items are tracked. When a new item arrives and the
+    table is full, the item with the lowest weight is evicted and the new
+    one inherits its weight as an error bound, so any item whose true
+    weight is above the smallest tracked weight is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self._weights = {}
+        self._errors = {}
+        self._counts = {}
+        # (weight, item) entries; stale ones are skipped on pop
+        self._heap = []
+
+    def __len__(self):
+        return len(self._weights)
+
+    def _push(self, item):
+        heapq.heappush(self._heap, (self._weights[item], item))
+
+        # Drop stale entries once they outnumber the live ones
+        if len(self._heap) > 4 * max(self.capacity, 1):
+            self._heap = [(weight, item) for item, weight in self._weights.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            weight, item = heapq.heappop(self._heap)
+            if self._weights.get(item) == weight:
+                return item, weight
+
+    def add(self, item, weight=1.0):
+        if item in self._weights:
+            self._weights[item] += weight
+            self._counts[item] += 1
+        elif len(self._weights) < self.capacity:
+            self._weights[item] = weight
+            self._errors[item] = 0.0
+            self._counts[item] = 1
+        else:
+            evicted, min_weight = self._pop_min()
+            del self._weights[evicted], self._errors[evicted], self._counts[evicted]
+
+            self._weights[item] = min_weight + weight
+            self._errors[item] = min_weight
+            self._counts[item] = 1
+
+        self._push(item)
+
+    def top(self, k) -> list:
+        """[(item, weight, error, count)] for the k heaviest items"""
+        heaviest = heapq.nlargest(k, self._weights.items(), key=lambda entry: entry[1])
+        return [(item, weight, self._errors[item], self._counts[item]) for item, weight in heaviest]
+
+    def merge(self, other):
+        """
+        Fold another table into this one
+
+        An item missing from a full table may still have had up to that
+        table's smallest weight, so it is charged that much (as error). If
+        the union outgrows capacity the lightest items are dropped.
+        """
+        self_floor = min(self._weights.values()) if len(self._weights) >= self.capacity else 0.0
+        other_floor = min(other._weights.values()) if len(other._weights) >= other.capacity else 0.0
+
+        for item, weight in other._weights.items():
+            if item in self._weights:
+                self._weights[item] += weight
+                self._errors[item] += other._errors[item]
+                self._counts[item] += other._counts[item]
+            else:
+                self._weights[item] = weight + self_floor
+                self._errors[item] = other._errors[item] + self_floor
+                self._counts[item] = other._counts[item]
+
+        for item in self._weights:
+            if item not in other._weights and other_floor:
+                self._weights[item] += other_floor
+                self._errors[item] += other_floor
+
+        if len(self._weights) > self.capacity:
+            kept = heapq.nlargest(self.capacity, self._weights, key=self._weights.get)
+            self._weights = {item: self._weights[item] for item in kept}
+            self._errors = {item: self._errors[item] for item in kept}
+            self._counts = {item: self._counts[item] for item in kept}
+
+        self._heap = [(weight, item) for item, weight in self._weights.items()]
+        heapq.heapify(self._heap)
+        return self
+
+
+SENTIMENTS = ("positive", "neutral", "negative")
+
+
+def _distribution(counts) -> dict:
+    return {sentiment: counts.get(sentiment, 0) for sentiment in SENTIMENTS}
+
+
+def _percentages(counts, total) -> dict:
+    return {sentiment: round((counts.get(sentiment, 0) / total) * 100, 1) for sentiment in SENTIMENTS}
+
+
+class AspectAggregator:
+    """
+    Running per-aspect statistics for a bulk analysis
+
+    Each aspect keeps sentiment counts, confidence and relevance sums, its
+    mention count and a fixed-size reservoir of sample text spans, so memory
+    grows with the number of distinct aspects rather than with reviews.
+    Aggregators built over separate chunks (or in separate workers) combine
+    with merge().
+    """
+
+    def __init__(self, sample_size=5, top_k_capacity=500, seed=None):
+        self.sample_size = sample_size
+        self.reviews = 0
+        self.overall_counts = Counter()
+        self.global_aspects = StreamingTopK(capacity=top_k_capacity)
+
+        self._aspects = {}
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return len(self._aspects)
+
+    def _stats(self, aspect):
+        stats = self._aspects.get(aspect)
+        if stats is None:
+            stats = self._aspects[aspect] = {
+                "sentiments": Counter(),
+                "confidence_sum": 0.0,
+                "relevance_sum": 0.0,
+                "mentions": 0,
+                "samples": []
+            }
+        return stats
+
+    def add_result(self, result):
+        """Count one analyzed review (an analyze_reviews_batch result)"""
+        self.reviews += 1
+        self.overall_counts[result["overall_sentiment"]] += 1
+
+        for aspect_data in result["aspects"]:
+            aspect = aspect_data["aspect"]
+            self.global_aspects.add(aspect, aspect_data["relevance_score"])
+
+            stats = self._stats(aspect)
+            stats["sentiments"][aspect_data["sentiment"]] += 1
+            stats["confidence_sum"] += aspect_data["confidence"]
+            stats["relevance_sum"] += aspect_data["relevance_score"]
+            stats["mentions"] += 1
+
+            # Reservoir sampling: the first sample_size spans are always kept
+            samples = stats["samples"]
+            if len(samples) < self.sample_size:
+                samples.append(aspect_data["text_span"])
+            else:
+                slot = self._random.randrange(stats["mentions"])
+                if slot < self.sample_size:
+                    samples[slot] = aspect_data["text_span"]
+
+    def _merge_samples(self, mine, mine_seen, theirs, theirs_seen):
+        """Sample of the union of two reservoirs, weighted by what each saw"""
+        mine, theirs = list(mine), list(theirs)
+        merged = []
+        while len(merged) < self.sample_size and (mine or theirs):
+            if theirs and (not mine or self._random.randrange(mine_seen + theirs_seen) >= mine_seen):
+                merged.append(theirs.pop(self._random.randrange(len(theirs))))
+                theirs_seen -= 1
+            else:
+                merged.append(mine.pop(self._random.randrange(len(mine))))
+                mine_seen -= 1
+        return merged
+
+    def merge(self, other):
+        """Fold another aggregator's counts into this one"""
+        self.reviews += other.reviews
+        self.overall_counts.update(other.overall_counts)
+        self.global_aspects.merge(other.global_aspects)
+
+        for aspect, theirs in other._aspects.items():
+            stats = self._stats(aspect)
+
+            if stats["mentions"] + theirs["mentions"] <= self.sample_size:
+                samples = stats["samples"] + theirs["samples"]
+            else:
+                samples = self._merge_samples(stats["samples"], stats["mentions"],
+                                              theirs["samples"], theirs["mentions"])
+
+            stats["sentiments"].update(theirs["sentiments"])
+            stats["confidence_sum"] += theirs["confidence_sum"]
+            stats["relevance_sum"] += theirs["relevance_sum"]
+            stats["mentions"] += theirs["mentions"]
+            stats["samples"] = samples
+
+        return self
+
+    def overall_summary(self, review_count) -> tuple:
+        """(overall sentiment counts, percentages of review_count)"""
+        return _distribution(self.overall_counts), _percentages(self.overall_counts, review_count)
+
+    def aspect_summary(self, review_count, min_mentions, max_samples=3) -> dict:
+        """Summary of every aspect mentioned at least min_mentions times"""
+        aspects_summary = {}
+
+        for aspect, stats in self._aspects.items():
+            mentions = stats["mentions"]
+            if mentions < min_mentions:
+                continue
+
+            aspects_summary[aspect] = {
+                "sentiment_distribution": _distribution(stats["sentiments"]),
+                "percentages": _percentages(stats["sentiments"], mentions),
+                "avg_confidence": round(stats["confidence_sum"] / mentions, 2),
+                "avg_relevance": round(stats["relevance_sum"] / mentions, 2),
+                "mentions": mentions,
+                "percentage_mentioned": round((mentions / review_count) * 100, 1),
+                "sample_reviews": stats["samples"][:max_samples]
+            }
+
+        return aspects_summary
+
+    def top_aspects(self, k) -> list:
+        """[{aspect, score, mentions}] for the k aspects with the highest total relevance"""
+        return [
+            {"aspect": aspect, "score": round(weight, 3), "mentions": count}
+            for aspect, weight, _, count in self.global_aspects.top(k)
+        ]
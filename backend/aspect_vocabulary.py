@@ -0,0 +1,179 @@
+# backend/aspect_vocabulary.py
+# Canonical aspect vocabulary with embedding-based nearest-neighbour mapping
+
+import json
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_VOCABULARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aspect_vocabulary.json")
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class AspectVocabulary:
+    """
+    Maps free-form aspects onto a fixed set of canonical aspects
+
+    Each canonical aspect has alias phrases; the canonical names and
+    aliases are embedded once into a normalized matrix (cached next to the
+    vocabulary file as <name>.embeddings.npz, and only reused if it was
+    built for the same phrases, model and embedding size). An aspect that is not an
+    exact name/alias is mapped to the canonical aspect of its most similar
+    phrase if the cosine similarity reaches threshold, and left as-is
+    otherwise. A whole batch is mapped with one matrix product.
+    """
+
+    def __init__(self, aspects: dict, threshold=0.8, path=None, model_name=""):
+        self.threshold = threshold
+        self.path = path
+        self.model_name = model_name
+
+        self.phrases = []
+        self.canonical_of = []
+        for canonical, aliases in aspects.items():
+            for phrase in [canonical] + list(aliases):
+                phrase = " ".join(phrase.lower().split())
+                if phrase and phrase not in self.phrases:
+                    self.phrases.append(phrase)
+                    self.canonical_of.append(canonical)
+
+        self._exact = dict(zip(self.phrases, self.canonical_of))
+        self._matrix = None
+        self._lock = threading.Lock()
+
+        self.exact_matches = 0
+        self.similarity_matches = 0
+        self.unmatched = 0
+
+    @classmethod
+    def load(cls, path, threshold=0.8, model_name=""):
+        """Read a vocabulary file of the form {"aspects": {canonical: [aliases]}}"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("aspects", {}), threshold=threshold, path=path, model_name=model_name)
+
+    def _embeddings_path(self):
+        return f"{os.path.splitext(self.path)[0]}.embeddings.npz" if self.path else None
+
+    def _load_embeddings(self, dimension):
+        """Cached phrase embeddings, if they were computed for these phrases, model and dimension"""
+        path = self._embeddings_path()
+        if not path or not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                phrases = data["phrases"].tolist()
+                model = str(data["model"])
+                matrix = data["matrix"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Aspect vocabulary embeddings load error: {e}")
+            return None
+
+        if phrases != self.phrases or model != self.model_name:
+            return None
+        if matrix.shape != (len(self.phrases), dimension):
+            print(f"Aspect vocabulary embeddings have shape {matrix.shape}, "
+                  f"expected {(len(self.phrases), dimension)} - rebuilding")
+            return None
+        return matrix
+
+    def _save_embeddings(self, matrix):
+        path = self._embeddings_path()
+        if not path:
+            return
+
+        # Per-process temp file, then one atomic rename of the single file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, phrases=np.array(self.phrases, dtype=str), model=np.array(self.model_name),
+                         matrix=matrix)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Aspect vocabulary embeddings save error: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _ensure_matrix(self, embed_fn, dimension):
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != dimension:
+                matrix = self._load_embeddings(dimension)
+                if matrix is None:
+                    matrix = np.asarray(embed_fn(self.phrases), dtype=np.float32)
+                    self._save_embeddings(matrix)
+                    print(f"Embedded {len(self.phrases)} canonical aspect phrases")
+                self._matrix = _normalize_rows(np.asarray(matrix, dtype=np.float32))
+            return self._matrix
+
+    def canonicalize(self, keywords, embed_fn) -> list:
+        """
+        Canonical aspect for each keyword (the keyword itself when nothing
+        is similar enough); embed_fn(list_of_phrases) -> embedding matrix
+        """
+        result = list(keywords)
+        pending = []
+
+        for index, keyword in enumerate(keywords):
+            canonical = self._exact.get(" ".join(keyword.lower().split()))
+            if canonical is not None:
+                result[index] = canonical
+                self.exact_matches += 1
+            else:
+                pending.append(index)
+
+        if pending and self.phrases:
+            vectors = _normalize_rows(np.asarray(embed_fn([keywords[i] for i in pending]), dtype=np.float32))
+            matrix = self._ensure_matrix(embed_fn, vectors.shape[1])
+
+            similarities = vectors @ matrix.T
+            best = similarities.argmax(axis=1)
+            best_scores = similarities[np.arange(len(pending)), best]
+
+            for index, phrase_index, score in zip(pending, best, best_scores):
+                if score >= self.threshold:
+                    result[index] = self.canonical_of[phrase_index]
+                    self.similarity_matches += 1
+                else:
+                    self.unmatched += 1
+        else:
+            self.unmatched += len(pending)
+
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "canonical_aspects": len(set(self.canonical_of)),
+            "phrases": len(self.phrases),
+            "threshold": self.threshold,
+            "exact_matches": self.exact_matches,
+            "similarity_matches": self.similarity_matches,
+            "unmatched": self.unmatched
+        }
+
+
+def create_aspect_vocabulary(model_name=""):
+    """
+    Load the vocabulary from the environment: ASPECT_VOCAB_PATH (default
+    aspect_vocabulary.json next to this module; empty disables
+    canonicalization) and ASPECT_CANONICAL_THRESHOLD (default 0.8)
+    """
+    path = os.getenv("ASPECT_VOCAB_PATH", DEFAULT_VOCABULARY_PATH)
+    if not path:
+        return None
+
+    try:
+        return AspectVocabulary.load(
+            path,
+            threshold=float(os.getenv("ASPECT_CANONICAL_THRESHOLD", "0.8")),
+            model_name=model_name
+        )
+    except (OSError, ValueError) as e:
+        print(f"Aspect vocabulary not loaded ({e}), canonicalization disabled")
+        return None
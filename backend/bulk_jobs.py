@@ -0,0 +1,162 @@
+# backend/bulk_jobs.py
+# Background job runner for bulk review uploads with progress tracking
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class BulkJobQueueFull(Exception):
+    """Raised when max_queued_jobs jobs are already waiting to run"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Bulk job queue is full")
+        self.retry_after = retry_after
+
+
+class BulkJob:
+    """State of one background bulk analysis"""
+
+    def __init__(self, total=None, metadata=None):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"  # "queued" | "running" | "completed" | "failed"
+        self.total = total
+        self.processed = 0
+        self.metadata = metadata or {}
+
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._started_clock = None
+        self._finished_clock = None
+
+        self.result = None
+        self.error = None
+
+    def update_progress(self, processed, total=None):
+        """Record progress; total may be unknown (None) until the input is read"""
+        self.processed = processed
+        if total is not None:
+            self.total = total
+
+    def to_dict(self) -> dict:
+        """Progress snapshot with throughput (reviews/sec) and ETA"""
+        throughput = 0.0
+        eta_seconds = None
+
+        if self._started_clock is not None:
+            elapsed = (self._finished_clock or time.monotonic()) - self._started_clock
+            if elapsed > 0 and self.processed > 0:
+                throughput = self.processed / elapsed
+                if self.status == "running" and self.total:
+                    eta_seconds = round(max(self.total - self.processed, 0) / throughput, 1)
+
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "progress_percentage": round((self.processed / self.total) * 100, 1) if self.total else 0.0,
+            "throughput_per_sec": round(throughput, 2),
+            "eta_seconds": eta_seconds,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            **self.metadata
+        }
+
+
+class BulkJobManager:
+    """
+    Runs bulk analyses on a worker pool and keeps their state for polling
+
+    Only the newest max_finished_jobs completed/failed jobs are retained.
+    At most max_queued_jobs may wait for a worker; further submissions are
+    rejected with BulkJobQueueFull.
+    """
+
+    def __init__(self, max_workers=1, max_finished_jobs=50, max_queued_jobs=4, retry_after=30):
+        self.max_finished_jobs = max_finished_jobs
+        self.max_queued_jobs = max_queued_jobs
+        self.retry_after = retry_after
+        self.rejected = 0
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bulk-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, total, metadata=None) -> BulkJob:
+        """
+        Queue fn(progress_callback) to run in the background (total may be
+        None when the review count isn't known up front)
+
+        progress_callback(processed, total) updates the job; fn's return
+        value becomes the job result. Raises BulkJobQueueFull if
+        max_queued_jobs jobs are already waiting.
+        """
+        job = BulkJob(total, metadata)
+
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == "queued")
+            if queued >= self.max_queued_jobs:
+                self.rejected += 1
+                raise BulkJobQueueFull(self.retry_after)
+            self._jobs[job.id] = job
+
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        job._started_clock = time.monotonic()
+
+        try:
+            job.result = fn(job.update_progress)
+            job.status = "completed"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.utcnow()
+            job._finished_clock = time.monotonic()
+            self._prune()
+
+    def _prune(self):
+        with self._lock:
+            finished = [j for j in self._jobs.values() if j.status in ("completed", "failed")]
+            for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+                del self._jobs[job.id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "completed", "failed")}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_bulk_job_manager() -> BulkJobManager:
+    """
+    Build the job manager from the environment: BULK_JOB_WORKERS (default 1),
+    BULK_JOB_RETENTION finished jobs kept for polling (default 50),
+    BULK_JOB_MAX_QUEUED jobs waiting to run (default 4) and
+    BULK_JOB_RETRY_AFTER seconds (default 30)
+    """
+    return BulkJobManager(
+        max_workers=int(os.getenv("BULK_JOB_WORKERS", "1")),
+        max_finished_jobs=int(os.getenv("BULK_JOB_RETENTION", "50")),
+        max_queued_jobs=int(os.getenv("BULK_JOB_MAX_QUEUED", "4")),
+        retry_after=int(os.getenv("BULK_JOB_RETRY_AFTER", "30"))
+    )
@@ -0,0 +1,127 @@
+# backend/bulk_workers.py
+# Process pool for bulk analysis, with the models loaded once per worker
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aspect_aggregation import AspectAggregator
+from inference_runtime import InferenceRuntimeProfile, create_inference_runtime_profile
+
+# The analyzer owned by this worker process (set by _init_worker)
+_worker_analyzer = None
+
+
+def _init_worker(sentiment_model_path, num_threads, workers, worker_slots, cpu_affinity):
+    """
+    Take a worker slot, apply that slot's share of the runtime profile (its
+    own cores out of cpu_affinity, num_threads torch threads) and load the
+    models - runs once per worker
+    """
+    global _worker_analyzer
+
+    profile = create_inference_runtime_profile(cpu_affinity).for_worker(
+        worker_slots.get(), workers, intra_op_threads=num_threads
+    )
+
+    from keybert_absa import SimplifiedABSA
+    _worker_analyzer = SimplifiedABSA(sentiment_model_path=sentiment_model_path, runtime_profile=profile)
+
+
+def _analyze_chunk(chunk, batch_size, top_k_capacity):
+    """Analyze one chunk in a worker; returns (chunk_results, partial aggregate)"""
+    aggregator = AspectAggregator(top_k_capacity=top_k_capacity)
+    chunk_results = _worker_analyzer.analyze_chunk(chunk, aggregator, batch_size=batch_size)
+    return chunk_results, aggregator
+
+
+class BulkProcessPool:
+    """
+    Worker processes that each hold their own KeyBERT + sentiment pipeline
+
+    Workers are spawned (not forked, so no torch/tokenizer state is shared)
+    and load the models once in their initializer, with torch limited to
+    threads_per_worker intra-op threads so workers x threads stays within
+    the cores available, and each pinned to its own slice of them (see
+    InferenceRuntimeProfile.for_worker). Chunks are analyzed in parallel
+    and come back with a partial AspectAggregator for the caller to merge.
+    """
+
+    def __init__(self, sentiment_model_path, workers=2, threads_per_worker=1, cpu_affinity=None):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        # Enough chunks queued to keep every worker busy without reading
+        # far ahead of the input
+        self.max_in_flight = workers * 2
+
+        # Each worker takes a distinct index for its slice of the cores
+        context = multiprocessing.get_context("spawn")
+        worker_slots = context.Queue()
+        for index in range(workers):
+            worker_slots.put(index)
+
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(sentiment_model_path, threads_per_worker, workers, worker_slots, cpu_affinity)
+        )
+
+        self.chunks_completed = 0
+
+    def map_chunks(self, chunks, batch_size, top_k_capacity):
+        """
+        Analyze an iterable of review chunks across the workers
+
+        Yields (chunk_results, partial_aggregator) in input order. At most
+        max_in_flight chunks are pulled from chunks ahead of the results
+        consumed; closing the generator cancels whatever has not started.
+        """
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(self._pool.submit(_analyze_chunk, chunk, batch_size, top_k_capacity))
+                if len(pending) >= self.max_in_flight:
+                    yield pending.popleft().result()
+                    self.chunks_completed += 1
+
+            while pending:
+                yield pending.popleft().result()
+                self.chunks_completed += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "chunks_completed": self.chunks_completed
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_bulk_process_pool(sentiment_model_path, cpu_affinity=None):
+    """
+    Build the pool from the environment, or None to analyze in-process
+
+    BULK_PROCESS_WORKERS worker processes (default 0 = disabled) split
+    cpu_affinity (the calling server worker's cores; default the cores this
+    process may run on) and each get BULK_WORKER_THREADS torch threads
+    (default: those cores split evenly between the workers).
+    """
+    workers = int(os.getenv("BULK_PROCESS_WORKERS", "0"))
+    if workers <= 0:
+        return None
+
+    cores = len(cpu_affinity) if cpu_affinity else len(InferenceRuntimeProfile.available_cores())
+    default_threads = max(1, cores // workers)
+    return BulkProcessPool(
+        sentiment_model_path,
+        workers=workers,
+        threads_per_worker=int(os.getenv("BULK_WORKER_THREADS", str(default_threads))),
+        cpu_affinity=cpu_affinity
+    )
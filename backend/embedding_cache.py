@@ -0,0 +1,186 @@
+# backend/embedding_cache.py
+# Process-wide LRU cache of KeyBERT candidate-phrase embeddings
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_phrase(phrase: str) -> str:
+    """Cache key for a phrase: lowercased with whitespace collapsed"""
+    return " ".join(phrase.lower().split())
+
+
+class PhraseEmbeddingCache:
+    """
+    Bounded LRU cache of phrase embeddings keyed by normalized phrase
+
+    Memory use is capped at max_bytes of vector data; the least recently
+    used phrases are evicted first. When a path is given, save() writes the
+    cache to <path>.npz (phrases and matrix in one file, replaced
+    atomically so concurrent workers never mix their saves) and load() reads
+    it back, so a restarted process starts warm. check_dimension() drops
+    loaded vectors that don't match the embedder.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _put(self, key, vector):
+        """Insert one vector (lock must be held)"""
+        if vector.nbytes > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+
+        # Evict least recently used until back under the ceiling
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def embed(self, phrases, embed_fn):
+        """
+        Return an embedding matrix for phrases, computing only cache misses
+
+        Misses are embedded with a single embed_fn(list_of_phrases) call and
+        stored. Rows are returned in the order of the input phrases.
+        """
+        keys = [normalize_phrase(p) for p in phrases]
+        vectors = [None] * len(keys)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    vectors[i] = vector
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                    self.misses += 1
+
+        if missing:
+            missing_keys = list(missing)
+            computed = np.asarray(embed_fn(missing_keys), dtype=np.float32)
+
+            with self._lock:
+                for key, vector in zip(missing_keys, computed):
+                    self._put(key, vector)
+                    for i in missing[key]:
+                        vectors[i] = vector
+
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and memory use"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def check_dimension(self, dimension):
+        """Drop cached vectors that aren't dimension long (e.g. saved for another model)"""
+        with self._lock:
+            stale = [key for key, vector in self._entries.items() if vector.shape[-1] != dimension]
+            for key in stale:
+                self._bytes -= self._entries.pop(key).nbytes
+
+        if stale:
+            print(f"Dropped {len(stale)} cached phrase embeddings not of dimension {dimension}")
+
+    def save(self, path=None):
+        """Persist the cache (most recently used last) to <path>.npz"""
+        path = path or self.path
+        if not path:
+            return
+
+        with self._lock:
+            keys = list(self._entries)
+            matrix = np.vstack(list(self._entries.values())) if keys else np.empty((0, 0), dtype=np.float32)
+
+        # Per-process temp file, then one atomic rename of the single file
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, keys=np.array(keys, dtype=str), matrix=matrix)
+            os.replace(tmp_path, f"{path}.npz")
+            print(f"Saved {len(keys)} phrase embeddings to {path}.npz")
+        except OSError as e:
+            print(f"Phrase cache save error: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load(self, path=None):
+        """Load a previously saved cache; a missing or inconsistent file is ignored"""
+        path = path or self.path
+        if not path or not os.path.exists(f"{path}.npz"):
+            return
+
+        try:
+            with np.load(f"{path}.npz", allow_pickle=False) as data:
+                keys = data["keys"].tolist()
+                matrix = data["matrix"].astype(np.float32, copy=False)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Phrase cache load error: {e}")
+            return
+
+        if keys and (matrix.ndim != 2 or matrix.shape[0] != len(keys)):
+            print(f"Phrase cache {path}.npz ignored: {len(keys)} phrases but matrix of shape {matrix.shape}")
+            return
+
+        with self._lock:
+            for key, vector in zip(keys, matrix):
+                self._put(key, vector)
+
+        print(f"Loaded {len(self._entries)} cached phrase embeddings from {path}.npz")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_phrase_cache() -> PhraseEmbeddingCache:
+    """
+    Process-wide phrase cache, configured from the environment:
+    PHRASE_CACHE_MAX_MB (default 64) and PHRASE_CACHE_PATH (optional)
+    """
+    global _default_cache
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PhraseEmbeddingCache(
+                max_bytes=int(float(os.getenv("PHRASE_CACHE_MAX_MB", "64")) * 1024 * 1024),
+                path=os.getenv("PHRASE_CACHE_PATH") or None
+            )
+        return _default_cache
@@ -0,0 +1,76 @@
+# backend/inference_backend.py
+# Selects how the sentiment model and the KeyBERT embedder run: PyTorch or ONNX Runtime
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from sentiment_model import create_sentiment_pipeline, quantize_enabled
+
+# Sentence-transformers model KeyBERT embeds documents and candidates with
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+INFERENCE_BACKENDS = ('torch', 'onnx')
+
+
+def configured_backend() -> str:
+    """INFERENCE_BACKEND (torch|onnx, default torch)"""
+    backend = os.getenv("INFERENCE_BACKEND", "torch").lower()
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND {backend!r}, expected one of {INFERENCE_BACKENDS}")
+    return backend
+
+
+def configured_variant() -> str:
+    """Backend and sentiment precision the environment selects, e.g. "torch-fp32" """
+    return f"{configured_backend()}-{'int8-dynamic' if quantize_enabled() else 'fp32'}"
+
+
+def _load_torch_embedder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 2)
+
+
+def load_inference_models(sentiment_model_path, runtime_profile=None, backend=None):
+    """
+    (KeyBERT model, sentiment classifier, info) for the chosen backend
+
+    "torch" (default) loads the sentence-transformers model and the
+    transformers pipeline. "onnx" exports both models to ONNX_MODEL_DIR
+    (default ./onnx_models) on first use and runs them with ONNX Runtime;
+    onnxruntime is only imported in that case. The backend comes from
+    INFERENCE_BACKEND unless given. SENTIMENT_QUANTIZE applies to either.
+
+    The two models are loaded concurrently; info records how long each took.
+    """
+    backend = backend or configured_backend()
+
+    if backend == "torch":
+        load_embedder = _load_torch_embedder
+        load_sentiment = partial(create_sentiment_pipeline, sentiment_model_path)
+    else:
+        from onnx_backend import load_onnx_embedder, load_onnx_sentiment_classifier
+
+        onnx_dir = os.getenv("ONNX_MODEL_DIR", "./onnx_models")
+        load_embedder = partial(load_onnx_embedder, EMBEDDING_MODEL, onnx_dir, runtime_profile)
+        load_sentiment = partial(load_onnx_sentiment_classifier, sentiment_model_path, onnx_dir,
+                                 runtime_profile, quantize=quantize_enabled())
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-load") as pool:
+        embedder_future = pool.submit(_timed, load_embedder)
+        sentiment_future = pool.submit(_timed, load_sentiment)
+        embedder, embedder_seconds = embedder_future.result()
+        (sentiment_model, info), sentiment_seconds = sentiment_future.result()
+
+    return embedder, sentiment_model, {
+        "backend": backend,
+        **info,
+        "load_seconds": {"embedder": embedder_seconds, "sentiment": sentiment_seconds}
+    }
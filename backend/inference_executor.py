@@ -0,0 +1,98 @@
+# backend/inference_executor.py
+# Bounded thread pool that keeps model inference off the event loop
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model calls on a dedicated pool with a bounded queue
+
+    At most max_workers calls run at once and at most queue_depth more may
+    wait; further submissions are rejected with InferenceQueueFull instead
+    of piling up behind a long bulk job.
+    """
+
+    def __init__(self, max_workers=2, queue_depth=16, retry_after=5):
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(max_workers + queue_depth)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        """Calls currently running or waiting"""
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit a call, returning a concurrent.futures.Future"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise InferenceQueueFull(self.retry_after)
+
+        with self._lock:
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Await a blocking call on the pool without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_inference_executor() -> InferenceExecutor:
+    """
+    Build the executor from the environment: INFERENCE_WORKERS (default 2),
+    INFERENCE_QUEUE_DEPTH (default 16) and INFERENCE_RETRY_AFTER seconds (default 5)
+    """
+    return InferenceExecutor(
+        max_workers=int(os.getenv("INFERENCE_WORKERS", "2")),
+        queue_depth=int(os.getenv("INFERENCE_QUEUE_DEPTH", "16")),
+        retry_after=int(os.getenv("INFERENCE_RETRY_AFTER", "5"))
+    )
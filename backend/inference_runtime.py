@@ -0,0 +1,277 @@
+# backend/inference_runtime.py
+# Torch threading, model-call concurrency and CPU affinity for CPU inference
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Lock file holding this process's server worker slot (kept open for the
+# process lifetime; the OS releases the lock when it exits)
+_worker_slot_file = None
+
+
+def parse_cpu_list(value: str) -> list:
+    """Cores from a list like "0-3,8,10-11" (as in taskset / cpuset)"""
+    cores = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    return sorted(set(cores))
+
+
+def _optional_int(value):
+    return int(value) if value not in (None, "") else None
+
+
+class InferenceRuntimeProfile:
+    """
+    How this process runs model inference
+
+    intra_op_threads / inter_op_threads are torch's two thread pools (None
+    keeps torch's default of one thread per core, which oversubscribes the
+    machine as soon as several server or bulk workers run side by side).
+    max_concurrent_calls caps how many model calls run at once in the
+    process, whatever thread they come from. cpu_affinity pins the process
+    to a list of cores.
+
+    apply() is called once before the models are loaded. worker is
+    (index, workers) for a profile made by for_worker.
+    """
+
+    def __init__(self, intra_op_threads=None, inter_op_threads=None, max_concurrent_calls=None,
+                 cpu_affinity=None):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.max_concurrent_calls = max_concurrent_calls
+        self.cpu_affinity = cpu_affinity
+
+        self._slots = threading.BoundedSemaphore(max_concurrent_calls) if max_concurrent_calls else None
+        self._lock = threading.Lock()
+        self._active = 0
+
+        self.worker = None
+        self.applied = False
+        self.warnings = []
+        self.calls = 0
+        self.waited_calls = 0
+        self.wait_ms = 0.0
+
+    def for_worker(self, index, workers, intra_op_threads=None):
+        """
+        Profile for worker `index` of `workers` processes sharing this one's
+        cores: each gets an equal, disjoint slice of cpu_affinity (or of the
+        cores this process may run on), one intra-op thread per core of its
+        slice and a single inter-op thread, unless configured otherwise
+        """
+        cores = self.cpu_affinity or self.available_cores()
+        share = max(1, len(cores) // workers) if cores else 0
+        worker_cores = cores[index * share:(index + 1) * share] if cores else None
+        if cores and not worker_cores:
+            # More workers than cores - they have to double up
+            worker_cores = [cores[index % len(cores)]]
+        default_threads = len(worker_cores) if worker_cores else None
+
+        profile = InferenceRuntimeProfile(
+            intra_op_threads=intra_op_threads or self.intra_op_threads or default_threads,
+            inter_op_threads=self.inter_op_threads or 1,
+            max_concurrent_calls=self.max_concurrent_calls,
+            cpu_affinity=worker_cores or None
+        )
+        profile.worker = (index, workers)
+        return profile
+
+    @staticmethod
+    def available_cores() -> list:
+        if hasattr(os, "sched_getaffinity"):
+            return sorted(os.sched_getaffinity(0))
+        return list(range(os.cpu_count() or 1))
+
+    def apply(self):
+        """Apply the thread counts and affinity to this process (once)"""
+        if self.applied:
+            return
+
+        if self.cpu_affinity:
+            if hasattr(os, "sched_setaffinity"):
+                try:
+                    os.sched_setaffinity(0, self.cpu_affinity)
+                except OSError as e:
+                    self.warnings.append(f"cpu_affinity not applied: {e}")
+            else:
+                self.warnings.append("cpu_affinity not supported on this platform")
+
+        if self.intra_op_threads:
+            if "torch" in sys.modules:
+                # OpenMP/MKL read these once, when torch is first imported
+                self.warnings.append(
+                    "OMP_NUM_THREADS/MKL_NUM_THREADS not set: torch was already imported "
+                    "(set them in the environment to size the OpenMP/MKL pools)"
+                )
+            else:
+                # Keeps OpenMP/MKL from sizing their own pools to every core
+                os.environ.setdefault("OMP_NUM_THREADS", str(self.intra_op_threads))
+                os.environ.setdefault("MKL_NUM_THREADS", str(self.intra_op_threads))
+
+        try:
+            import torch
+        except ImportError:
+            self.warnings.append("torch not installed, thread settings not applied")
+            self.applied = True
+            return
+
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+
+        if self.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError as e:
+                # Can only be set once, before any inter-op parallel work
+                self.warnings.append(f"inter_op_threads not applied: {e}")
+
+        self.applied = True
+
+    @contextmanager
+    def model_call(self):
+        """Hold one of the max_concurrent_calls slots for the wrapped model call"""
+        if self._slots is None:
+            with self._lock:
+                self.calls += 1
+                self._active += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._active -= 1
+            return
+
+        waited = not self._slots.acquire(blocking=False)
+        if waited:
+            start = time.perf_counter()
+            self._slots.acquire()
+            wait_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.calls += 1
+            self._active += 1
+            if waited:
+                self.waited_calls += 1
+                self.wait_ms += wait_ms
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Configured values next to what torch / the OS actually report"""
+        effective = {
+            "cpu_affinity": self.available_cores(),
+            "omp_num_threads": os.environ.get("OMP_NUM_THREADS"),
+            "mkl_num_threads": os.environ.get("MKL_NUM_THREADS")
+        }
+        try:
+            import torch
+            effective["intra_op_threads"] = torch.get_num_threads()
+            effective["inter_op_threads"] = torch.get_num_interop_threads()
+        except ImportError:
+            pass
+
+        return {
+            "configured": {
+                "intra_op_threads": self.intra_op_threads,
+                "inter_op_threads": self.inter_op_threads,
+                "max_concurrent_calls": self.max_concurrent_calls,
+                "cpu_affinity": self.cpu_affinity
+            },
+            "effective": effective,
+            "worker": {"index": self.worker[0], "workers": self.worker[1]} if self.worker else None,
+            "applied": self.applied,
+            "warnings": self.warnings,
+            "active_calls": self._active,
+            "calls": self.calls,
+            "waited_calls": self.waited_calls,
+            "avg_wait_ms": round(self.wait_ms / self.waited_calls, 2) if self.waited_calls else 0.0
+        }
+
+
+def create_inference_runtime_profile(cpu_affinity=None, max_concurrent_calls=None) -> InferenceRuntimeProfile:
+    """
+    Build the profile from the environment: INFERENCE_INTRA_OP_THREADS,
+    INFERENCE_INTER_OP_THREADS, INFERENCE_MAX_CONCURRENT_CALLS (each unset =
+    torch default / max_concurrent_calls, None for unlimited) and
+    INFERENCE_CPU_AFFINITY, a core list such as "0-3,8" (cpu_affinity, if
+    given, is used instead)
+    """
+    affinity = os.getenv("INFERENCE_CPU_AFFINITY", "")
+    return InferenceRuntimeProfile(
+        intra_op_threads=_optional_int(os.getenv("INFERENCE_INTRA_OP_THREADS")),
+        inter_op_threads=_optional_int(os.getenv("INFERENCE_INTER_OP_THREADS")),
+        max_concurrent_calls=_optional_int(os.getenv("INFERENCE_MAX_CONCURRENT_CALLS")) or max_concurrent_calls,
+        cpu_affinity=cpu_affinity or (parse_cpu_list(affinity) if affinity else None)
+    )
+
+
+def claim_worker_slot(workers, slot_dir):
+    """
+    Index (0..workers-1) of the first slot lock file in slot_dir no other
+    process holds, kept locked until this process exits; None if every slot
+    is taken or file locks are unavailable
+    """
+    global _worker_slot_file
+
+    try:
+        import fcntl
+    except ImportError:
+        return None
+
+    os.makedirs(slot_dir, exist_ok=True)
+    for index in range(workers):
+        slot_file = open(os.path.join(slot_dir, f"slot-{index}.lock"), "w")
+        try:
+            fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            slot_file.close()
+            continue
+        _worker_slot_file = slot_file
+        return index
+
+    return None
+
+
+def create_server_runtime_profile(max_concurrent_calls=None) -> InferenceRuntimeProfile:
+    """
+    The runtime profile for one API server process (max_concurrent_calls is
+    the default when INFERENCE_MAX_CONCURRENT_CALLS is unset)
+
+    With INFERENCE_SERVER_WORKERS (default WEB_CONCURRENCY, as uvicorn and
+    gunicorn use for their worker count) above 1, each server worker claims
+    a slot with a lock file in INFERENCE_WORKER_SLOT_DIR and takes that
+    slot's disjoint share of the cores (InferenceRuntimeProfile.for_worker),
+    so the workers don't all pin themselves to the same ones.
+    """
+    profile = create_inference_runtime_profile(max_concurrent_calls=max_concurrent_calls)
+    workers = int(os.getenv("INFERENCE_SERVER_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1")
+    if workers <= 1:
+        return profile
+
+    slot_dir = os.getenv("INFERENCE_WORKER_SLOT_DIR") or os.path.join(
+        tempfile.gettempdir(), "sentiment-api-worker-slots"
+    )
+    index = claim_worker_slot(workers, slot_dir)
+    if index is None:
+        profile.warnings.append(f"no free worker slot of {workers} in {slot_dir}, cores not partitioned")
+        return profile
+
+    return profile.for_worker(index, workers)
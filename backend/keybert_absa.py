@@ -2,21 +2,54 @@
 # Enhanced ABSA System with Adaptive Length Handling
 
 from keybert import KeyBERT
-from transformers import pipeline
-from collections import Counter
-import re
+from keybert._mmr import mmr
+from keybert._maxsum import max_sum_distance
+from sklearn.feature_extraction.text import CountVectorizer
+from itertools import islice
 from difflib import SequenceMatcher
+import time
+from embedding_cache import get_phrase_cache
+from review_document import ReviewDocument
+from aspect_aggregation import AspectAggregator
+from aspect_vocabulary import create_aspect_vocabulary
+from metrics import StageMetrics
+from inference_runtime import create_inference_runtime_profile
+from sentiment_model import LABEL_MAP
+from inference_backend import EMBEDDING_MODEL, load_inference_models
 
 class SimplifiedABSA:
     """
     Enhanced aspect extraction with length-adaptive rules
     """
     
-    def __init__(self, sentiment_model_path="./my_finetuned_sentiment_model"):
+    def __init__(self, sentiment_model_path="./my_finetuned_sentiment_model", phrase_cache=None,
+                 stage_metrics=None, aspect_vocabulary=None, runtime_profile=None):
         print("Initializing Enhanced KeyBERT ABSA System...")
         
-        self.keybert = KeyBERT(model='all-MiniLM-L6-v2')
-        self.sentiment_model = pipeline("sentiment-analysis", model=sentiment_model_path)
+        # Torch threads / affinity must be in place before the models load
+        self.runtime = runtime_profile or create_inference_runtime_profile()
+        self.runtime.apply()
+        
+        # PyTorch or ONNX Runtime (INFERENCE_BACKEND), fp32 or int8 (SENTIMENT_QUANTIZE)
+        embedding_model, self.sentiment_model, self.sentiment_model_info = load_inference_models(
+            sentiment_model_path, self.runtime
+        )
+        self.keybert = KeyBERT(model=embedding_model)
+        
+        # Size of the embedder's vectors, for checking cached embeddings against
+        self.embedding_dim = int(self.keybert.model.embed(["battery"]).shape[-1])
+        
+        # Candidate phrase embeddings are shared across reviews (and instances);
+        # any loaded from disk for a different embedder are dropped
+        self.phrase_cache = phrase_cache or get_phrase_cache()
+        self.phrase_cache.check_dimension(self.embedding_dim)
+        
+        # Latency/batch size/token counts per pipeline stage
+        self.stage_metrics = stage_metrics or StageMetrics()
+        
+        # Canonical aspect names synonyms are mapped onto (built from the
+        # environment unless given; ASPECT_VOCAB_PATH="" disables mapping)
+        self.aspect_vocabulary = aspect_vocabulary or create_aspect_vocabulary(model_name=EMBEDDING_MODEL)
         
         # Expanded stopwords - words that are NEVER aspects
         self.non_aspect_words = {
@@ -150,7 +183,10 @@ class SimplifiedABSA:
         return True
     
     def clean_aspect(self, keyword: str) -> str:
-        """Clean and normalize aspect"""
+        """
+        Clean aspect (synonyms are mapped to canonical names afterwards, by
+        the aspect vocabulary)
+        """
         words = keyword.split()
         
         # Remove non-aspect words from edges
@@ -159,28 +195,18 @@ class SimplifiedABSA:
         while words and words[-1].lower() in self.non_aspect_words:
             words.pop()
         
-        cleaned = ' '.join(words)
-        
-        # Normalize common variations
-        replacements = {
-            'amoled display': 'display',
-            'battery life': 'battery',
-            'fitness tracking': 'fitness',
-            'notification syncing': 'notifications',
-            'build quality': 'build',
-        }
-        
-        for old, new in replacements.items():
-            if old in cleaned.lower():
-                return new
-        
-        return cleaned
+        return ' '.join(words)
     
     def deduplicate_aspects(self, aspects: list) -> list:
         """
         Intelligent deduplication:
         - Remove similar/overlapping aspects
         - Keep shorter, more general terms
+        
+        Kept aspects are held in insertion order in a dict (O(1) removal).
+        Each keeps its word set and a SequenceMatcher primed with its
+        keyword, and the full similarity ratio is only computed when the
+        length and character-count upper bounds allow it to exceed 0.7.
         """
         if not aspects:
             return []
@@ -188,164 +214,261 @@ class SimplifiedABSA:
         # Sort by relevance score (descending) and length (ascending)
         aspects.sort(key=lambda x: (-x['relevance_score'], len(x['keyword'])))
         
-        deduplicated = []
+        # index -> (aspect, keyword, word set, matcher), in the order kept
+        kept = {}
         seen_keywords = set()
         
-        for aspect in aspects:
+        for index, aspect in enumerate(aspects):
             keyword = aspect['keyword'].lower()
             
             # Skip if exact duplicate
             if keyword in seen_keywords:
                 continue
             
+            words = set(keyword.split())
+            
             # Check similarity with existing aspects
             is_duplicate = False
-            for existing in deduplicated:
-                existing_keyword = existing['keyword'].lower()
-                
+            replaced = None
+            for existing_index, (existing, existing_keyword, existing_words, matcher) in kept.items():
                 # Case 1: One is substring of another
                 if keyword in existing_keyword or existing_keyword in keyword:
                     # Keep the shorter one (more general)
                     if len(keyword) < len(existing_keyword):
-                        deduplicated.remove(existing)
-                        break
+                        replaced = existing_index
                     else:
                         is_duplicate = True
-                        break
+                    break
                 
-                # Case 2: High text similarity (> 70%)
-                if self.similarity_ratio(keyword, existing_keyword) > 0.7:
-                    # Keep the one with higher relevance or shorter length
-                    if (aspect['relevance_score'] > existing['relevance_score'] or 
-                        len(keyword) < len(existing_keyword)):
-                        deduplicated.remove(existing)
-                        break
-                    else:
-                        is_duplicate = True
+                # Case 2: High text similarity (> 70%) - the ratio can't
+                # beat 2 * shorter length / total length, or quick_ratio()
+                shorter = min(len(keyword), len(existing_keyword))
+                if 2.0 * shorter / (len(keyword) + len(existing_keyword)) > 0.7:
+                    matcher.set_seq1(keyword)
+                    if matcher.quick_ratio() > 0.7 and matcher.ratio() > 0.7:
+                        # Keep the one with higher relevance or shorter length
+                        if (aspect['relevance_score'] > existing['relevance_score'] or 
+                            len(keyword) < len(existing_keyword)):
+                            replaced = existing_index
+                        else:
+                            is_duplicate = True
                         break
                 
                 # Case 3: Same words in different order
-                words1 = set(keyword.split())
-                words2 = set(existing_keyword.split())
-                if words1 == words2:
+                if words == existing_words:
                     is_duplicate = True
                     break
             
+            if replaced is not None:
+                del kept[replaced]
+            
             if not is_duplicate:
-                deduplicated.append(aspect)
+                kept[index] = (aspect, keyword, words, SequenceMatcher(None, '', keyword))
                 seen_keywords.add(keyword)
         
-        return deduplicated
+        return [entry[0] for entry in kept.values()]
     
-    def extract_aspects(self, text, top_n=8, use_mmr=True):
+    def get_extraction_params(self, length_category: str, top_n: int) -> tuple:
         """
-        Extract aspects with adaptive filtering based on text length
+        Adaptive KeyBERT parameters based on review length
+        
+        Returns: (candidates_n, diversity, nr_candidates)
         """
-        try:
-            # Determine review length category
-            length_category = self.get_review_length_category(text)
-            
-            # Adaptive parameters based on length
-            if length_category == 'short':
-                candidates_n = min(top_n * 3, 20)  # Fewer candidates for short reviews
-                diversity = 0.5  # Less diversity needed
-                nr_candidates = 30
-            elif length_category == 'medium':
-                candidates_n = min(top_n * 4, 30)
-                diversity = 0.6
-                nr_candidates = 50
-            else:  # long
-                candidates_n = min(top_n * 4, 40)
-                diversity = 0.7
-                nr_candidates = 100
-            
-            # Extract keywords
-            if use_mmr:
-                keywords = self.keybert.extract_keywords(
-                    text,
-                    keyphrase_ngram_range=(1, 2),
-                    stop_words='english',
-                    top_n=candidates_n,
-                    use_mmr=True,
-                    diversity=diversity,
-                    nr_candidates=nr_candidates
-                )
-            else:
-                keywords = self.keybert.extract_keywords(
-                    text,
-                    keyphrase_ngram_range=(1, 2),
-                    stop_words='english',
-                    top_n=candidates_n,
-                    use_maxsum=True,
-                    nr_candidates=nr_candidates
-                )
+        if length_category == 'short':
+            candidates_n = min(top_n * 3, 20)  # Fewer candidates for short reviews
+            diversity = 0.5  # Less diversity needed
+            nr_candidates = 30
+        elif length_category == 'medium':
+            candidates_n = min(top_n * 4, 30)
+            diversity = 0.6
+            nr_candidates = 50
+        else:  # long
+            candidates_n = min(top_n * 4, 40)
+            diversity = 0.7
+            nr_candidates = 100
+        
+        return candidates_n, diversity, nr_candidates
+    
+    def filter_aspects(self, keywords, length_category):
+        """Filter and clean raw (keyword, score) candidates"""
+        # Filter valid aspects with length-adaptive rules
+        valid_aspects = []
+        for keyword, score in keywords:
+            if not self.is_valid_aspect(keyword, length_category):
+                continue
             
-            # Filter valid aspects with length-adaptive rules
-            valid_aspects = []
-            for keyword, score in keywords:
-                if not self.is_valid_aspect(keyword, length_category):
-                    continue
-                
-                cleaned = self.clean_aspect(keyword)
-                if not cleaned or len(cleaned) < 4:
-                    continue
-                
-                valid_aspects.append({
-                    "keyword": cleaned,
-                    "relevance_score": round(score, 3)
-                })
+            cleaned = self.clean_aspect(keyword)
+            if not cleaned or len(cleaned) < 4:
+                continue
             
-            # Deduplicate
+            valid_aspects.append({
+                "keyword": cleaned,
+                "relevance_score": round(score, 3)
+            })
+        
+        return valid_aspects
+    
+    def canonicalize_aspects(self, aspects):
+        """
+        Rename aspects to their canonical vocabulary entry, in one batch
+        
+        The wording found in the review is kept as "surface" so context and
+        phrase lookups still find it in the text.
+        """
+        if self.aspect_vocabulary is None or not aspects:
+            return
+        
+        def embed(phrases):
+            with self.runtime.model_call():
+                return self.phrase_cache.embed(phrases, self.keybert.model.embed)
+        
+        canonical = self.aspect_vocabulary.canonicalize([a["keyword"] for a in aspects], embed)
+        
+        for aspect, name in zip(aspects, canonical):
+            if name != aspect["keyword"]:
+                aspect["surface"] = aspect["keyword"]
+                aspect["keyword"] = name
+    
+    def select_aspects(self, valid_aspects, length_category, top_n):
+        """Deduplicate and trim filtered candidates"""
+        # Deduplicate
+        with self.stage_metrics.time("dedup", batch_size=len(valid_aspects)):
             deduplicated = self.deduplicate_aspects(valid_aspects)
+        
+        # Adaptive top_n based on length
+        if length_category == 'short':
+            final_n = min(top_n // 2, len(deduplicated))  # Fewer aspects for short reviews
+        else:
+            final_n = min(top_n, len(deduplicated))
+        
+        return deduplicated[:final_n]
+    
+    def extract_aspects_many(self, texts, top_n=8, use_mmr=True, failed=None):
+        """
+        Extract aspects for many reviews with one shared embedding pass
+        
+        Fits a single (1, 2)-gram vocabulary over all texts, embeds every
+        document and every unique candidate phrase once (candidates already
+        in the phrase cache are not re-embedded), then runs MMR (or
+        Max Sum) per document with that review's length-adaptive settings.
+        Per-document results match calling KeyBERT on each text on its own.
+        
+        Returns one list of aspects per input text. Texts whose extraction
+        failed get an empty list and their index is added to the failed set,
+        if one is given.
+        """
+        failed = failed if failed is not None else set()
+        if not texts:
+            return []
+        
+        start = time.perf_counter()
+        
+        try:
+            vectorizer = CountVectorizer(ngram_range=(1, 2), stop_words='english').fit(texts)
+        except ValueError:
+            # Only stop words in every text - nothing to extract
+            return [[] for _ in texts]
+        
+        try:
+            words = vectorizer.get_feature_names_out()
+            doc_terms = vectorizer.transform(texts)
             
-            # Adaptive top_n based on length
-            if length_category == 'short':
-                final_n = min(top_n // 2, len(deduplicated))  # Fewer aspects for short reviews
-            else:
-                final_n = min(top_n, len(deduplicated))
-            
-            return deduplicated[:final_n]
-            
+            # One embedding pass for all documents and all uncached candidates
+            with self.runtime.model_call():
+                doc_embeddings = self.keybert.model.embed(list(texts))
+                word_embeddings = self.phrase_cache.embed(list(words), self.keybert.model.embed)
         except Exception as e:
             print(f"KeyBERT error: {e}")
-            return []
+            failed.update(range(len(texts)))
+            return [[] for _ in texts]
+        
+        doc_keywords = []
+        for index, text in enumerate(texts):
+            try:
+                length_category = self.get_review_length_category(text)
+                candidates_n, diversity, nr_candidates = self.get_extraction_params(length_category, top_n)
+                
+                candidate_indices = doc_terms[index].nonzero()[1]
+                candidates = [words[i] for i in candidate_indices]
+                candidate_embeddings = word_embeddings[candidate_indices]
+                doc_embedding = doc_embeddings[index].reshape(1, -1)
+                
+                try:
+                    if use_mmr:
+                        keywords = mmr(doc_embedding, candidate_embeddings, candidates,
+                                       candidates_n, diversity)
+                    else:
+                        keywords = max_sum_distance(doc_embedding, candidate_embeddings, candidates,
+                                                    candidates_n, nr_candidates)
+                except ValueError:
+                    # No candidates (or fewer than Max Sum needs) for this review
+                    keywords = []
+                
+                doc_keywords.append((length_category, keywords))
+            except Exception as e:
+                print(f"KeyBERT error: {e}")
+                failed.add(index)
+                doc_keywords.append(None)
+        
+        self.stage_metrics.record("keybert_extraction", (time.perf_counter() - start) * 1000,
+                                  batch_size=len(texts))
+        
+        doc_aspects = []
+        for index, entry in enumerate(doc_keywords):
+            try:
+                doc_aspects.append(self.filter_aspects(entry[1], entry[0]) if entry else [])
+            except Exception as e:
+                print(f"KeyBERT error: {e}")
+                failed.add(index)
+                doc_aspects.append([])
+        
+        # Map synonyms onto canonical aspects for the whole batch at once
+        try:
+            self.canonicalize_aspects([a for aspects in doc_aspects for a in aspects])
+        except Exception as e:
+            print(f"Aspect canonicalization error: {e}")
+            failed.update(range(len(texts)))
+        
+        results = []
+        for index, (entry, aspects) in enumerate(zip(doc_keywords, doc_aspects)):
+            try:
+                results.append(self.select_aspects(aspects, entry[0], top_n) if entry else [])
+            except Exception as e:
+                print(f"KeyBERT error: {e}")
+                failed.add(index)
+                results.append([])
+        
+        return results
     
-    def extract_aspect_phrase(self, text, aspect, window_size=6):
+    def extract_aspects(self, text, top_n=8, use_mmr=True):
+        """
+        Extract aspects with adaptive filtering based on text length
+        """
+        return self.extract_aspects_many([text], top_n=top_n, use_mmr=use_mmr)[0]
+    
+    def extract_aspect_phrase(self, text, aspect, window_size=6, doc=None):
         """
         Extract the specific phrase around the aspect (5-6 words)
+        
+        doc is the review's ReviewDocument (built here if not given).
         """
-        text_lower = text.lower()
+        doc = doc or ReviewDocument(text)
         aspect_lower = aspect.lower()
         
         # Find the aspect in text
-        if aspect_lower not in text_lower:
+        if aspect_lower not in doc.text_lower:
             return text[:100]  # Fallback
         
-        # Split into words while preserving positions
-        words = text.split()
-        words_lower = [w.lower() for w in words]
-        
-        # Find aspect position (handle multi-word aspects)
-        aspect_words = aspect_lower.split()
-        aspect_positions = []
-        
-        for i in range(len(words_lower) - len(aspect_words) + 1):
-            # Check if aspect matches at this position
-            match = True
-            for j, aspect_word in enumerate(aspect_words):
-                # Remove punctuation for matching
-                word_clean = re.sub(r'[^\w\s]', '', words_lower[i + j])
-                if aspect_word not in word_clean:
-                    match = False
-                    break
-            if match:
-                aspect_positions.append((i, i + len(aspect_words)))
+        # Find aspect position (handle multi-word aspects) - each aspect word
+        # must appear inside consecutive punctuation-stripped words
+        aspect_position = doc.find_phrase(aspect_lower)
         
-        if not aspect_positions:
+        if aspect_position is None:
             return text[:100]  # Fallback
         
         # Use first occurrence
-        start_idx, end_idx = aspect_positions[0]
+        start_idx, end_idx = aspect_position
+        words = doc.tokens
         
         # Extract window around aspect
         before = max(0, start_idx - 3)  # 3 words before
@@ -363,76 +486,119 @@ class SimplifiedABSA:
         
         return phrase
     
-    def analyze_aspect_sentiment(self, text, aspect):
-        """Analyze sentiment for a specific aspect with context"""
-        text_lower = text.lower()
-        aspect_lower = aspect.lower()
+    def find_aspect_context(self, text, aspect, doc=None):
+        """
+        Return the sentence containing the aspect (full text as fallback)
         
-        # Find sentence containing aspect
-        sentences = text.replace('!', '.').replace('?', '.').split('.')
-        context = ""
+        doc is the review's ReviewDocument (built here if not given).
+        """
+        doc = doc or ReviewDocument(text)
         
-        for sentence in sentences:
-            if aspect_lower in sentence.lower():
-                context = sentence.strip()
-                break
+        # Find sentence containing aspect
+        sentence_index = doc.find_sentence(aspect.lower())
+        context = doc.sentences[sentence_index].strip() if sentence_index is not None else ""
         
         if not context or len(context) < 5:
             context = text
         
+        return context
+    
+    def count_tokens(self, texts):
+        """
+        Estimated model input tokens for texts (whitespace words) - cheap
+        enough for the hot path, unlike running the tokenizer a second time
+        """
+        return sum(len(t.split()) for t in texts)
+    
+    def classify_texts(self, texts, batch_size=None, stages=None):
+        """
+        Score texts with batched sentiment pipeline calls
+        
+        Duplicate texts are scored once. Texts are sorted by length before
+        batching so each batch pads to items of similar length; by default
+        everything goes in one batch. stages, [(stage, count)] over
+        consecutive slices of texts, splits the call's time between stages
+        by item count (default: all of it under "sentiment").
+        Returns one (sentiment, confidence) tuple per input text, in input order.
+        """
+        unique_texts = sorted(dict.fromkeys(texts), key=len)
+        if not unique_texts:
+            return []
+        
+        with self.runtime.model_call():
+            start = time.perf_counter()
+            results = self.sentiment_model(
+                unique_texts,
+                batch_size=max(1, batch_size or len(unique_texts)),
+                truncation=True
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        position = 0
+        for stage, count in stages or [("sentiment", len(texts))]:
+            if count:
+                stage_texts = texts[position:position + count]
+                self.stage_metrics.record(stage, elapsed_ms * count / len(texts), batch_size=count,
+                                          tokens=self.count_tokens(stage_texts))
+            position += count
+        
+        scored = {
+            t: (LABEL_MAP.get(r['label'], 'neutral'), round(r['score'], 3))
+            for t, r in zip(unique_texts, results)
+        }
+        return [scored[t] for t in texts]
+    
+    def analyze_aspect_sentiment(self, text, aspect):
+        """Analyze sentiment for a specific aspect with context"""
+        doc = ReviewDocument(text)
+        context = self.find_aspect_context(text, aspect, doc)
+        
         try:
-            result = self.sentiment_model(context)[0]
-            label_map = {
-                'LABEL_0': 'negative',
-                'LABEL_1': 'neutral',
-                'LABEL_2': 'positive'
-            }
+            sentiment, confidence = self.classify_texts([context], stages=[("aspect_sentiment", 1)])[0]
             
             # Extract short phrase around aspect (5-6 words)
-            short_phrase = self.extract_aspect_phrase(text, aspect)
+            short_phrase = self.extract_aspect_phrase(text, aspect, doc=doc)
             
             return {
-                "sentiment": label_map.get(result['label'], 'neutral'),
-                "confidence": round(result['score'], 3),
+                "sentiment": sentiment,
+                "confidence": confidence,
                 "text_span": short_phrase
             }
         except Exception as e:
             print(f"Sentiment error: {e}")
             return None
     
-    def analyze_single_review(self, text, top_n=8):
+    def _build_review_result(self, text, aspects, scores, doc=None, extraction_failed=False):
         """
-        Analyze single review with adaptive aspect extraction
+        Assemble a review result from its aspects and (overall, *aspect) scores
+        
+        "fallback" is True when the result is degraded - no scores (neutral
+        / 0.5 defaults) or aspect extraction failed - so callers can avoid
+        caching it.
         """
+        doc = doc or ReviewDocument(text)
+        
+        # Locate every aspect of the review in one pass over its tokens
+        doc.locate_phrases([aspect_data.get("surface", aspect_data["keyword"]).lower() for aspect_data in aspects])
+        
         # Overall sentiment
-        try:
-            overall_result = self.sentiment_model(text)[0]
-            label_map = {
-                'LABEL_0': 'negative',
-                'LABEL_1': 'neutral',
-                'LABEL_2': 'positive'
-            }
-            overall_sentiment = label_map.get(overall_result['label'], 'neutral')
-            overall_confidence = round(overall_result['score'], 3)
-        except Exception as e:
-            print(f"Overall sentiment error: {e}")
+        if scores:
+            overall_sentiment, overall_confidence = scores[0]
+        else:
             overall_sentiment = 'neutral'
             overall_confidence = 0.5
         
-        # Extract and deduplicate aspects (adaptive to length)
-        aspects = self.extract_aspects(text, top_n=top_n)
-        
-        # Analyze sentiment for each aspect
+        # Sentiment for each aspect
         aspects_with_sentiment = []
-        for aspect_data in aspects:
-            sentiment_result = self.analyze_aspect_sentiment(text, aspect_data["keyword"])
-            
-            if sentiment_result:
+        if scores:
+            for aspect_data, (sentiment, confidence) in zip(aspects, scores[1:]):
                 aspects_with_sentiment.append({
                     "aspect": aspect_data["keyword"],
-                    "sentiment": sentiment_result["sentiment"],
-                    "confidence": sentiment_result["confidence"],
-                    "text_span": sentiment_result["text_span"],
+                    "sentiment": sentiment,
+                    "confidence": confidence,
+                    "text_span": self.extract_aspect_phrase(
+                        text, aspect_data.get("surface", aspect_data["keyword"]), doc=doc
+                    ),
                     "relevance_score": aspect_data["relevance_score"]
                 })
         
@@ -440,113 +606,221 @@ class SimplifiedABSA:
             "overall_sentiment": overall_sentiment,
             "overall_confidence": overall_confidence,
             "aspects": aspects_with_sentiment,
-            "total_aspects_found": len(aspects_with_sentiment)
+            "total_aspects_found": len(aspects_with_sentiment),
+            "fallback": not scores or extraction_failed
         }
     
-    def analyze_bulk_reviews(self, reviews, product_name, top_n=15):
+    def analyze_reviews_batch(self, texts, top_n=8, batch_size=None):
         """
-        Analyze multiple reviews with adjusted top_n
+        Analyze a chunk of reviews with cross-review micro-batching
+        
+        Stages:
+        1. Extract aspect candidates for every review in the chunk
+        2. Gather every aspect context sentence
+        3. Score the overall texts and all the contexts in one call, in
+           length-sorted batches of batch_size (its time is split between
+           the overall_sentiment and aspect_sentiment stages)
+        4. Scatter the scores back to their reviews
+        
+        Returns one analyze_single_review-style result per input text
+        ("fallback" marks degraded ones).
         """
-        print(f"\n📊 Analyzing {len(reviews)} reviews for '{product_name}'...")
+        # Stage 1: aspect extraction (adaptive to length), one embedding pass
+        failed = set()
+        extracted = self.extract_aspects_many(texts, top_n=top_n, failed=failed)
+        
+        # Stage 2: aspect context sentences, per review (each review is
+        # split into sentences/tokens once and reused for its phrases)
+        docs = [ReviewDocument(text) for text in texts]
+        review_contexts = [
+            [self.find_aspect_context(text, a.get("surface", a["keyword"]), doc) for a in aspects]
+            for text, aspects, doc in zip(texts, extracted, docs)
+        ]
         
-        combined_text = " ".join(reviews)
+        # Stage 3: score the whole chunk in one call, overall texts first
+        all_contexts = [c for contexts in review_contexts for c in contexts]
+        stages = [("overall_sentiment", len(texts)), ("aspect_sentiment", len(all_contexts))]
+        try:
+            all_scores = self.classify_texts(list(texts) + all_contexts, batch_size=batch_size, stages=stages)
+        except Exception as e:
+            print(f"Batch sentiment error: {e}")
+            all_scores = None
+        
+        # Stage 4: scatter results back to their reviews
+        results = []
+        position = len(texts)
+        for index, (text, aspects, contexts) in enumerate(zip(texts, extracted, review_contexts)):
+            if all_scores is not None:
+                scores = [all_scores[index]] + all_scores[position:position + len(contexts)]
+                position += len(contexts)
+            else:
+                # Chunk failed as a whole - retry this review on its own
+                try:
+                    scores = self.classify_texts(
+                        [text] + contexts,
+                        stages=[("overall_sentiment", 1), ("aspect_sentiment", len(contexts))]
+                    )
+                except Exception as e:
+                    print(f"Sentiment error: {e}")
+                    scores = None
+            
+            results.append(self._build_review_result(text, aspects, scores, docs[index],
+                                                     extraction_failed=index in failed))
         
-        print("  Extracting aspects...")
-        global_aspects = self.extract_aspects(combined_text, top_n=top_n * 2)
+        return results
+    
+    def analyze_single_review(self, text, top_n=8):
+        """
+        Analyze single review with adaptive aspect extraction
         
+        The overall text and every aspect's context sentence are scored
+        together in a single batched forward pass.
+        """
+        return self.analyze_reviews_batch([text], top_n=top_n)[0]
+    
+    def analyze_bulk_reviews(self, reviews, product_name, top_n=15, return_individual=False,
+                             chunk_size=64, batch_size=64, progress_callback=None, process_pool=None):
+        """
+        Analyze multiple reviews with adjusted top_n
+        
+        Collects iter_bulk_reviews into one result. With return_individual=True,
+        returns (summary, individual_results) where individual_results holds the
+        per-review analyses from this same pass (empty reviews skipped), so
+        callers never need to re-analyze a review.
+        """
         all_results = []
-        aspect_aggregation = {}
+        summary = None
+        
+        for kind, payload in self.iter_bulk_reviews(reviews, product_name, top_n=top_n,
+                                                    chunk_size=chunk_size, batch_size=batch_size,
+                                                    progress_callback=progress_callback,
+                                                    process_pool=process_pool):
+            if kind == "results":
+                if return_individual:
+                    all_results.extend(payload)
+            else:
+                summary = payload
         
-        for i, review_text in enumerate(reviews):
-            if i % 50 == 0 and i > 0:
-                print(f"  Progress: {i}/{len(reviews)}")
-            
-            if len(review_text.strip()) == 0:
-                continue
-            
-            # Use fewer aspects per review (5 instead of 10)
-            result = self.analyze_single_review(review_text, top_n=5)
-            
-            all_results.append({
+        if return_individual:
+            return summary, all_results
+        return summary
+    
+    def analyze_chunk(self, chunk, aggregator, batch_size=64):
+        """Analyze one chunk of non-empty reviews into aggregator; returns the per-review results"""
+        # Use fewer aspects per review (5 instead of 10)
+        batch_results = self.analyze_reviews_batch(chunk, top_n=5, batch_size=batch_size)
+        chunk_results = []
+        
+        for review_text, result in zip(chunk, batch_results):
+            chunk_results.append({
                 "text": review_text,
                 "overall_sentiment": result["overall_sentiment"],
                 "overall_confidence": result["overall_confidence"],
-                "aspects": result["aspects"]
+                "aspects": result["aspects"],
+                "total_aspects_found": result["total_aspects_found"]
             })
+            aggregator.add_result(result)
+        
+        return chunk_results
+    
+    def iter_bulk_reviews(self, reviews, product_name, top_n=15, chunk_size=64,
+                          batch_size=64, progress_callback=None, process_pool=None):
+        """
+        Analyze multiple reviews incrementally
+        
+        Reviews are processed chunk_size at a time through
+        analyze_reviews_batch, scoring sentiment in batches of batch_size.
+        Yields ("results", chunk_results) as each chunk finishes and
+        ("summary", summary) once at the end; only an AspectAggregator
+        (running counts, sums and a small sample of spans per aspect) is kept
+        between chunks. progress_callback(processed, total) is called after
+        every chunk.
+        
+        The summary's global_aspects (top_n * 2) are the aspects with the
+        highest summed relevance across reviews, tracked with a bounded
+        streaming top-k as chunks complete.
+        
+        reviews may be any iterable (e.g. a streaming file reader); it is
+        consumed one chunk at a time and only iterated once.
+        
+        With a process_pool (bulk_workers.BulkProcessPool) chunks are analyzed
+        in parallel worker processes and their partial aggregates merged here
+        as they come back, in input order.
+        """
+        is_sequence = hasattr(reviews, '__len__')
+        total = len(reviews) if is_sequence else None
+        # Progress counts analyzed (non-empty) reviews
+        progress_total = sum(1 for r in reviews if len(r.strip()) > 0) if is_sequence else None
+        print(f"\n📊 Analyzing {total if is_sequence else 'streamed'} reviews for '{product_name}'...")
+        
+        aggregator = AspectAggregator(top_k_capacity=max(top_n * 20, 100))
+        
+        # Count every review pulled (empty ones included) for the percentages
+        review_count = 0
+        
+        def non_empty_reviews():
+            nonlocal review_count
+            for review_text in reviews:
+                review_count += 1
+                if len(review_text.strip()) > 0:
+                    yield review_text
+        
+        review_iter = non_empty_reviews()
+        
+        def review_chunks():
+            while True:
+                chunk = list(islice(review_iter, chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+        
+        if process_pool is None:
+            chunk_results_iter = (
+                self.analyze_chunk(chunk, aggregator, batch_size=batch_size)
+                for chunk in review_chunks()
+            )
+        else:
+            chunk_results_iter = self._merge_worker_chunks(
+                process_pool.map_chunks(review_chunks(), batch_size, aggregator.global_aspects.capacity),
+                aggregator
+            )
+        
+        for chunk_results in chunk_results_iter:
+            print(f"  Progress: {aggregator.reviews}/{progress_total if is_sequence else '?'}")
+            if progress_callback:
+                progress_callback(aggregator.reviews, progress_total)
             
-            for aspect_data in result["aspects"]:
-                aspect = aspect_data["aspect"]
-                
-                if aspect not in aspect_aggregation:
-                    aspect_aggregation[aspect] = {
-                        "sentiments": [],
-                        "confidences": [],
-                        "relevance_scores": [],
-                        "mentions": 0,
-                        "sample_texts": []
-                    }
-                
-                aspect_aggregation[aspect]["sentiments"].append(aspect_data["sentiment"])
-                aspect_aggregation[aspect]["confidences"].append(aspect_data["confidence"])
-                aspect_aggregation[aspect]["relevance_scores"].append(aspect_data["relevance_score"])
-                aspect_aggregation[aspect]["mentions"] += 1
-                
-                if len(aspect_aggregation[aspect]["sample_texts"]) < 5:
-                    aspect_aggregation[aspect]["sample_texts"].append(aspect_data["text_span"])
+            yield "results", chunk_results
         
         print(f"✅ Analysis complete!")
         
         # Stricter filtering: 5% threshold instead of 3%
-        aspects_summary = {}
-        min_mentions = max(2, int(len(reviews) * 0.05))
+        min_mentions = max(2, int(review_count * 0.05))
+        aspects_summary = aggregator.aspect_summary(review_count, min_mentions)
+        overall_sentiment, overall_percentage = aggregator.overall_summary(review_count)
         
-        for aspect, data in aspect_aggregation.items():
-            if data["mentions"] >= min_mentions:
-                sentiment_counts = Counter(data["sentiments"])
-                total = sum(sentiment_counts.values())
-                
-                aspects_summary[aspect] = {
-                    "sentiment_distribution": {
-                        "positive": sentiment_counts.get("positive", 0),
-                        "neutral": sentiment_counts.get("neutral", 0),
-                        "negative": sentiment_counts.get("negative", 0)
-                    },
-                    "percentages": {
-                        "positive": round((sentiment_counts.get("positive", 0) / total) * 100, 1),
-                        "neutral": round((sentiment_counts.get("neutral", 0) / total) * 100, 1),
-                        "negative": round((sentiment_counts.get("negative", 0) / total) * 100, 1)
-                    },
-                    "avg_confidence": round(sum(data["confidences"]) / len(data["confidences"]), 2),
-                    "avg_relevance": round(sum(data["relevance_scores"]) / len(data["relevance_scores"]), 2),
-                    "mentions": data["mentions"],
-                    "percentage_mentioned": round((data["mentions"] / len(reviews)) * 100, 1),
-                    "sample_reviews": data["sample_texts"][:3]
-                }
-        
-        overall_sentiments = [r["overall_sentiment"] for r in all_results]
-        sentiment_counts = Counter(overall_sentiments)
-        
-        insights = self._generate_insights(aspects_summary, sentiment_counts, len(reviews))
+        insights = self._generate_insights(aspects_summary, aggregator.overall_counts, review_count)
         
         print(f"🎯 Found {len(aspects_summary)} significant aspects\n")
         
-        return {
+        summary = {
             "product_name": product_name,
-            "total_reviews": len(all_results),
+            "total_reviews": aggregator.reviews,
             "aspects_found": len(aspects_summary),
-            "overall_sentiment": {
-                "positive": sentiment_counts.get("positive", 0),
-                "neutral": sentiment_counts.get("neutral", 0),
-                "negative": sentiment_counts.get("negative", 0)
-            },
-            "overall_percentage": {
-                "positive": round((sentiment_counts.get("positive", 0) / len(reviews)) * 100, 1),
-                "neutral": round((sentiment_counts.get("neutral", 0) / len(reviews)) * 100, 1),
-                "negative": round((sentiment_counts.get("negative", 0) / len(reviews)) * 100, 1)
-            },
+            "overall_sentiment": overall_sentiment,
+            "overall_percentage": overall_percentage,
             "aspects": aspects_summary,
+            "global_aspects": aggregator.top_aspects(top_n * 2),
             "key_insights": insights
         }
+        
+        yield "summary", summary
+    
+    def _merge_worker_chunks(self, worker_results, aggregator):
+        """Fold each worker's partial aggregate into aggregator, yielding its chunk results"""
+        for chunk_results, partial in worker_results:
+            aggregator.merge(partial)
+            yield chunk_results
     
     def _generate_insights(self, aspects_summary, sentiment_counts, total_reviews):
         """Generate insights from analysis"""
@@ -0,0 +1,323 @@
+# backend/metrics.py
+# Fixed-bucket latency histograms (mergeable by adding counts), in-process
+# request/ML stage metrics and Prometheus text exposition
+
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Log-linear bucket bounds in milliseconds: 0, then 18 linear steps per
+# decade (1.0, 1.5, ... 9.5 x 10^e) from 0.1 ms up to 100 s. Bucket i holds
+# values in (BUCKET_BOUNDS[i], BUCKET_BOUNDS[i + 1]] - upper-inclusive, like
+# Prometheus "le" buckets - with 0 itself in the first bucket. The last
+# bucket is open-ended.
+BUCKET_BOUNDS = [0.0] + [
+    round((1 + step * 0.5) * 10 ** exponent, 6)
+    for exponent in range(-1, 5)
+    for step in range(18)
+] + [100000.0]
+
+NUM_BUCKETS = len(BUCKET_BOUNDS)
+
+
+def bucket_index(value_ms: float) -> int:
+    """Bucket holding value_ms"""
+    return max(bisect_left(BUCKET_BOUNDS, value_ms) - 1, 0)
+
+
+class LatencyHistogram:
+    """
+    Latency distribution as counts over BUCKET_BOUNDS
+
+    Histograms from different hours/endpoints/processes combine by adding
+    their counts, so percentiles can be computed over any window. The exact
+    sum is kept alongside so averages stay exact.
+    """
+
+    def __init__(self, counts=None, total_ms=0.0):
+        self.counts = list(counts) if counts else [0] * NUM_BUCKETS
+        self.total_ms = total_ms
+
+    @classmethod
+    def from_doc(cls, doc):
+        """
+        Histogram of a stored traffic doc; older docs that only have the
+        response_times sample array are bucketed from those samples
+        """
+        counts = doc.get("latency_histogram")
+        if counts:
+            return cls(counts, doc.get("latency_sum_ms", 0.0))
+
+        histogram = cls()
+        for value in doc.get("response_times") or []:
+            histogram.record(value)
+        return histogram
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def record(self, value_ms: float):
+        self.counts[bucket_index(value_ms)] += 1
+        self.total_ms += value_ms
+
+    def merge(self, other):
+        """Add another histogram's counts into this one"""
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.total_ms += other.total_ms
+        return self
+
+    def mean(self) -> float:
+        count = self.count
+        return self.total_ms / count if count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimated q-th percentile (0-100), interpolated linearly within the
+        bucket it falls in
+        """
+        count = self.count
+        if not count:
+            return 0.0
+
+        rank = q / 100 * count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKET_BOUNDS[i]
+                # The open-ended last bucket reports its lower bound
+                upper = BUCKET_BOUNDS[i + 1] if i + 1 < NUM_BUCKETS else lower
+                return lower + (upper - lower) * max(rank - seen, 0) / n
+            seen += n
+        return BUCKET_BOUNDS[-1]
+
+    def cumulative_counts(self, bounds_ms):
+        """Observations <= each bound (bounds should be bucket boundaries)"""
+        cumulative = []
+        for bound in bounds_ms:
+            cumulative.append(sum(self.counts[:bisect_left(BUCKET_BOUNDS, bound)]))
+        return cumulative
+
+    def summary(self) -> dict:
+        """Average and p50/p95/p99 in milliseconds"""
+        return {
+            "avg_response_time": round(self.mean(), 2),
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2)
+        }
+
+
+def histogram_merge_update(histogram, inc=None, set_fields=None):
+    """
+    Update pipeline adding histogram into a stored doc's latency_histogram /
+    latency_sum_ms element-wise (works for upserts - missing fields count as 0)
+
+    inc adds to other numeric fields; set_fields are assigned as-is.
+    """
+    merged = {
+        "latency_histogram": {
+            "$map": {
+                "input": {"$range": [0, NUM_BUCKETS]},
+                "as": "i",
+                "in": {
+                    "$add": [
+                        {"$ifNull": [{"$arrayElemAt": ["$latency_histogram", "$$i"]}, 0]},
+                        {"$arrayElemAt": [{"$literal": histogram.counts}, "$$i"]}
+                    ]
+                }
+            }
+        },
+        "latency_sum_ms": {"$add": [{"$ifNull": ["$latency_sum_ms", 0]}, histogram.total_ms]}
+    }
+
+    for field, value in (inc or {}).items():
+        merged[field] = {"$add": [{"$ifNull": [f"${field}", 0]}, value]}
+
+    for field, value in (set_fields or {}).items():
+        merged[field] = {"$literal": value}
+
+    return [{"$set": merged}]
+
+
+class StageMetrics:
+    """
+    In-process timings for the stages of the ML pipeline
+
+    Each stage keeps a latency histogram, call/item counts (items = batch
+    size), max batch size, estimated token count and the items seen in the
+    last minute.
+    """
+
+    RATE_WINDOW_SECONDS = 60
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage: str, batch_size=1, tokens=0):
+        """Time the wrapped block as one call of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000, batch_size, tokens)
+
+    def record(self, stage: str, elapsed_ms: float, batch_size=1, tokens=0):
+        now = time.monotonic()
+
+        with self._lock:
+            data = self._stages.get(stage)
+            if data is None:
+                data = self._stages[stage] = {
+                    "histogram": LatencyHistogram(),
+                    "calls": 0,
+                    "items": 0,
+                    "max_batch_size": 0,
+                    "tokens": 0,
+                    "recent": deque()
+                }
+
+            data["histogram"].record(elapsed_ms)
+            data["calls"] += 1
+            data["items"] += batch_size
+            data["max_batch_size"] = max(data["max_batch_size"], batch_size)
+            data["tokens"] += tokens
+            data["recent"].append((now, batch_size))
+            self._prune(data["recent"], now)
+
+    def _prune(self, recent, now):
+        while recent and recent[0][0] < now - self.RATE_WINDOW_SECONDS:
+            recent.popleft()
+
+    def items_per_minute(self, stage: str) -> int:
+        with self._lock:
+            data = self._stages.get(stage)
+            if data is None:
+                return 0
+            self._prune(data["recent"], time.monotonic())
+            return sum(items for _, items in data["recent"])
+
+    def latency(self, stage: str) -> LatencyHistogram:
+        """Copy of a stage's latency histogram (empty if it never ran)"""
+        with self._lock:
+            data = self._stages.get(stage)
+            if data is None:
+                return LatencyHistogram()
+            return LatencyHistogram(data["histogram"].counts, data["histogram"].total_ms)
+
+    def collect(self):
+        """[(stage, histogram, calls, items, tokens)] snapshot"""
+        with self._lock:
+            return [
+                (stage, LatencyHistogram(data["histogram"].counts, data["histogram"].total_ms),
+                 data["calls"], data["items"], data["tokens"])
+                for stage, data in self._stages.items()
+            ]
+
+    def snapshot(self) -> dict:
+        """Per-stage latency (ms), batch sizes, tokens and share of total time"""
+        now = time.monotonic()
+
+        with self._lock:
+            total_ms = sum(data["histogram"].total_ms for data in self._stages.values())
+            stages = {}
+
+            for stage, data in self._stages.items():
+                histogram = data["histogram"]
+                self._prune(data["recent"], now)
+
+                stages[stage] = {
+                    "calls": data["calls"],
+                    "items": data["items"],
+                    "avg_batch_size": round(data["items"] / data["calls"], 2),
+                    "max_batch_size": data["max_batch_size"],
+                    "tokens": data["tokens"],
+                    "avg_tokens_per_item": round(data["tokens"] / data["items"], 1) if data["items"] else 0.0,
+                    "items_per_min": sum(items for _, items in data["recent"]),
+                    "avg_ms": round(histogram.mean(), 2),
+                    "p50_ms": round(histogram.percentile(50), 2),
+                    "p95_ms": round(histogram.percentile(95), 2),
+                    "p99_ms": round(histogram.percentile(99), 2),
+                    "total_ms": round(histogram.total_ms, 1),
+                    "time_share": round(histogram.total_ms / total_ms * 100, 1) if total_ms else 0.0
+                }
+
+        return stages
+
+
+class RequestMetrics:
+    """In-process request counts (by status) and latency per (method, route)"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status_code: int, elapsed_ms: float):
+        with self._lock:
+            data = self._routes.get((method, route))
+            if data is None:
+                data = self._routes[(method, route)] = {
+                    "histogram": LatencyHistogram(),
+                    "statuses": Counter()
+                }
+            data["histogram"].record(elapsed_ms)
+            data["statuses"][status_code] += 1
+
+    def collect(self):
+        """[(method, route, status_counts, histogram)] snapshot"""
+        with self._lock:
+            return [
+                (method, route, dict(data["statuses"]),
+                 LatencyHistogram(data["histogram"].counts, data["histogram"].total_ms))
+                for (method, route), data in self._routes.items()
+            ]
+
+
+# Prometheus "le" bounds (ms) - each is a BUCKET_BOUNDS boundary
+PROMETHEUS_BOUNDS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class PrometheusWriter:
+    """Builds a response in the Prometheus text exposition format (0.0.4)"""
+
+    def __init__(self):
+        self._lines = []
+        self._families = set()
+
+    def family(self, name: str, kind: str, help_text: str):
+        """Declare a metric family (HELP/TYPE are written once)"""
+        if name not in self._families:
+            self._families.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, labels=None):
+        value = str(value) if isinstance(value, int) else repr(float(value))
+        self._lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    def histogram(self, name: str, histogram, labels=None):
+        """Write a LatencyHistogram (recorded in ms) as a histogram in seconds"""
+        labels = labels or {}
+        for bound, count in zip(PROMETHEUS_BOUNDS_MS, histogram.cumulative_counts(PROMETHEUS_BOUNDS_MS)):
+            self.sample(f"{name}_bucket", count, {**labels, "le": f"{bound / 1000:g}"})
+        self.sample(f"{name}_bucket", histogram.count, {**labels, "le": "+Inf"})
+        self.sample(f"{name}_sum", histogram.total_ms / 1000, labels)
+        self.sample(f"{name}_count", histogram.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
@@ -0,0 +1,76 @@
+# backend/model_loader.py
+# Background model loading with a readiness state for the API
+
+import threading
+import time
+import traceback
+from datetime import datetime
+
+
+class ModelLoader:
+    """
+    Runs load_fn once on a background thread
+
+    The API starts serving immediately; endpoints that need the models
+    check `ready` (and answer 503 until then) while everything else works
+    as usual. status() reports the loading state for /ready.
+    """
+
+    def __init__(self, load_fn, retry_after=10):
+        self.load_fn = load_fn
+        self.retry_after = retry_after
+
+        self.state = "pending"  # "pending" | "loading" | "ready" | "failed"
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._started_clock = None
+        self._finished_clock = None
+
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self):
+        """Begin loading (no-op if already started)"""
+        if self._thread is not None:
+            return
+
+        self.state = "loading"
+        self.started_at = datetime.utcnow()
+        self._started_clock = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.load_fn()
+            self.state = "ready"
+            self._ready.set()
+        except Exception as e:
+            traceback.print_exc()
+            self.error = str(e)
+            self.state = "failed"
+        finally:
+            self.finished_at = datetime.utcnow()
+            self._finished_clock = time.monotonic()
+
+    def wait(self, timeout=None) -> bool:
+        """Block until the models are ready (or timeout); returns ready"""
+        return self._ready.wait(timeout)
+
+    def status(self) -> dict:
+        load_seconds = None
+        if self._started_clock is not None:
+            load_seconds = round((self._finished_clock or time.monotonic()) - self._started_clock, 2)
+
+        return {
+            "status": self.state,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "load_seconds": load_seconds,
+            "error": self.error
+        }
@@ -0,0 +1,49 @@
+# backend/mongo_metrics.py
+# MongoDB command latency, collected with a pymongo command listener
+
+import threading
+from collections import Counter
+
+from pymongo import monitoring
+
+from metrics import LatencyHistogram
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Latency histogram and failure count per Mongo command name
+
+    Pass an instance to MongoClient(event_listeners=[...]); pymongo reports
+    every command's duration to it, so nothing is added to the call sites.
+    """
+
+    def __init__(self):
+        self._commands = {}
+        self._failures = Counter()
+        self._lock = threading.Lock()
+
+    def _record(self, command_name, duration_micros):
+        with self._lock:
+            histogram = self._commands.get(command_name)
+            if histogram is None:
+                histogram = self._commands[command_name] = LatencyHistogram()
+            histogram.record(duration_micros / 1000)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event.command_name, event.duration_micros)
+
+    def failed(self, event):
+        self._record(event.command_name, event.duration_micros)
+        with self._lock:
+            self._failures[event.command_name] += 1
+
+    def collect(self):
+        """[(command_name, histogram, failures)] snapshot"""
+        with self._lock:
+            return [
+                (name, LatencyHistogram(histogram.counts, histogram.total_ms), self._failures[name])
+                for name, histogram in self._commands.items()
+            ]
@@ -0,0 +1,239 @@
+# backend/onnx_backend.py
+# ONNX Runtime versions of the sentiment classifier and the KeyBERT sentence embedder
+
+import json
+import os
+
+import numpy as np
+import onnxruntime as ort
+from keybert.backend import BaseEmbedder
+
+from sentiment_model import model_fingerprint
+
+# Inputs a transformers tokenizer may produce, in the order they are exported
+MODEL_INPUT_NAMES = ('input_ids', 'attention_mask', 'token_type_ids')
+
+# Reviews the exported graphs are checked against the PyTorch model with
+PARITY_PROBES = [
+    "The battery life is great but the screen quality is bad.",
+    "Delivery was late.",
+    "Good value for the price, though the strap feels cheap and the app keeps losing sync with my phone."
+]
+
+
+def _export(model, tokenizer, onnx_path, output_name, tolerance):
+    """
+    Export model's output_name ("logits" / "last_hidden_state") to ONNX with
+    dynamic batch and sequence axes, then check the exported graph against
+    the PyTorch model on PARITY_PROBES
+    """
+    import torch
+
+    model.eval()
+    sample = tokenizer(PARITY_PROBES, padding=True, truncation=True, return_tensors='pt')
+    input_names = [name for name in MODEL_INPUT_NAMES if name in sample]
+
+    class ExportWrapper(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[output_name]
+
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['output'] = {0: 'batch'} if output_name == 'logits' else {0: 'batch', 1: 'sequence'}
+
+    os.makedirs(os.path.dirname(onnx_path) or '.', exist_ok=True)
+    with torch.no_grad():
+        # The exporter restores the wrapper's train/eval mode afterwards, so
+        # it must be in eval mode too or dropout is left switched on
+        torch.onnx.export(
+            ExportWrapper().eval(),
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=['output'],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+        expected = model(**{name: sample[name] for name in input_names})[output_name].numpy()
+
+    session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    actual = session.run(None, {name: sample[name].numpy() for name in input_names})[0]
+    difference = float(np.abs(actual - expected).max())
+    if difference > tolerance:
+        os.remove(onnx_path)
+        raise RuntimeError(f"ONNX export of {output_name} differs from PyTorch by {difference:.2e}")
+
+
+def _ensure_exported(source, onnx_path, fingerprint, export_fn):
+    """Export unless onnx_path was already built from this fingerprint"""
+    meta_path = onnx_path + '.json'
+    expected = {"source": source, "fingerprint": fingerprint}
+
+    if os.path.exists(onnx_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) == expected:
+                return False
+
+    print(f"Exporting {source} to ONNX ({onnx_path})...")
+    export_fn()
+    with open(meta_path, 'w') as f:
+        json.dump(expected, f)
+    return True
+
+
+def _session(onnx_path, runtime_profile=None):
+    """CPU session using the runtime profile's thread counts"""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if runtime_profile is not None:
+        if runtime_profile.intra_op_threads:
+            options.intra_op_num_threads = runtime_profile.intra_op_threads
+        if runtime_profile.inter_op_threads:
+            options.inter_op_num_threads = runtime_profile.inter_op_threads
+    return ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def _softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+class OnnxSentimentClassifier:
+    """
+    The fine-tuned sentiment model on ONNX Runtime
+
+    Called like the transformers "sentiment-analysis" pipeline (a text or a
+    list of texts, batch_size, truncation) and returns the same
+    [{"label", "score"}] results; tokenizer is exposed the same way.
+    """
+
+    def __init__(self, session, tokenizer, id2label):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.id2label = id2label
+        self._input_names = [i.name for i in session.get_inputs()]
+
+    def __call__(self, texts, batch_size=1, truncation=False, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+
+        results = []
+        batch_size = max(1, batch_size)
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                list(texts[start:start + batch_size]), padding=True, truncation=truncation,
+                return_tensors='np'
+            )
+            logits = self.session.run(None, {
+                name: encoded[name].astype(np.int64) for name in self._input_names
+            })[0]
+
+            probabilities = _softmax(logits)
+            for row in probabilities:
+                label_id = int(row.argmax())
+                results.append({'label': self.id2label[label_id], 'score': float(row[label_id])})
+
+        return results
+
+
+class OnnxSentenceEmbedder(BaseEmbedder):
+    """
+    Sentence embeddings for KeyBERT from an ONNX export of the transformer
+
+    Applies the same mean pooling over the attention mask and L2
+    normalization as the sentence-transformers model, truncating at
+    max_length tokens.
+    """
+
+    def __init__(self, session, tokenizer, max_length=256, batch_size=32):
+        super().__init__()
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self._input_names = [i.name for i in session.get_inputs()]
+
+    def embed(self, documents, verbose=False):
+        batches = []
+        for start in range(0, len(documents), self.batch_size):
+            encoded = self.tokenizer(
+                list(documents[start:start + self.batch_size]), padding=True, truncation=True,
+                max_length=self.max_length, return_tensors='np'
+            )
+            token_embeddings = self.session.run(None, {
+                name: encoded[name].astype(np.int64) for name in self._input_names
+            })[0]
+
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            batches.append(pooled / np.clip(norms, 1e-12, None))
+
+        if not batches:
+            return np.empty((0, self.session.get_outputs()[0].shape[-1] or 0), dtype=np.float32)
+        return np.vstack(batches).astype(np.float32)
+
+
+def load_onnx_sentiment_classifier(model_path, onnx_dir, runtime_profile=None, quantize=False,
+                                   tolerance=1e-3):
+    """
+    OnnxSentimentClassifier for model_path, exporting it to onnx_dir first
+    if needed (and with quantize=True, an int8 dynamic-quantized copy).
+    Returns (classifier, info).
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    onnx_path = os.path.join(onnx_dir, 'sentiment.onnx')
+    fingerprint = model_fingerprint(model_path)
+
+    _ensure_exported(
+        model_path, onnx_path, fingerprint,
+        lambda: _export(AutoModelForSequenceClassification.from_pretrained(model_path), tokenizer,
+                        onnx_path, 'logits', tolerance)
+    )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(onnx_dir, 'sentiment.int8.onnx')
+        _ensure_exported(
+            onnx_path, quantized_path, fingerprint,
+            lambda: quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+        )
+        onnx_path = quantized_path
+
+    with open(os.path.join(model_path, 'config.json')) as f:
+        id2label = {int(k): v for k, v in json.load(f).get('id2label', {}).items()}
+
+    classifier = OnnxSentimentClassifier(_session(onnx_path, runtime_profile), tokenizer, id2label)
+    info = {"precision": "int8-dynamic" if quantize else "fp32", "onnx_path": onnx_path}
+    return classifier, info
+
+
+def load_onnx_embedder(model_name, onnx_dir, runtime_profile=None, tolerance=1e-4):
+    """
+    OnnxSentenceEmbedder for a sentence-transformers model (hub name or
+    path), exporting its transformer to onnx_dir first if needed
+    """
+    from transformers import AutoModel, AutoTokenizer
+
+    if '/' in model_name or os.path.isdir(model_name):
+        repo = model_name
+    else:
+        repo = f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(repo)
+    onnx_path = os.path.join(onnx_dir, 'embedder.onnx')
+    fingerprint = model_fingerprint(repo) if os.path.isdir(repo) else repo
+
+    _ensure_exported(
+        repo, onnx_path, fingerprint,
+        lambda: _export(AutoModel.from_pretrained(repo), tokenizer, onnx_path, 'last_hidden_state',
+                        tolerance)
+    )
+
+    return OnnxSentenceEmbedder(_session(onnx_path, runtime_profile), tokenizer)
@@ -0,0 +1,132 @@
+# backend/quantization_parity.py
+# Compares the int8 quantized sentiment model against fp32 on a held-out file
+#
+# Usage:
+#   python quantization_parity.py held_out.csv [--model-path ./my_finetuned_sentiment_model]
+#       [--min-agreement 0.98] [--max-accuracy-drop 0.01]
+#
+# The CSV needs a review column (same names as uploads: review, text, ...)
+# and may have a label column (label/sentiment: negative/neutral/positive,
+# LABEL_0-2 or 0-2). Exits non-zero if the quantized model falls short.
+
+import argparse
+import csv
+import sys
+import time
+
+from review_ingest import find_review_column
+from sentiment_model import LABEL_MAP, load_sentiment_pipeline
+
+POSSIBLE_LABEL_COLUMNS = ['label', 'sentiment', 'gold', 'target']
+
+NUMERIC_LABELS = {'0': 'negative', '1': 'neutral', '2': 'positive'}
+
+
+def normalize_label(value):
+    """Gold label as negative/neutral/positive, or None if unrecognised"""
+    value = str(value).strip()
+    if value in LABEL_MAP:
+        return LABEL_MAP[value]
+    if value in NUMERIC_LABELS:
+        return NUMERIC_LABELS[value]
+    value = value.lower()
+    return value if value in LABEL_MAP.values() else None
+
+
+def read_held_out(path):
+    """(texts, labels) from a CSV; labels is None when there is no label column"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+
+    if not rows:
+        return [], None
+
+    header = rows[0]
+    text_column = find_review_column(header)
+    label_column = next(
+        (i for i, name in enumerate(header) if name.strip().lower() in POSSIBLE_LABEL_COLUMNS),
+        None
+    )
+
+    texts, labels = [], []
+    for row in rows[1:]:
+        if len(row) <= text_column or not row[text_column].strip():
+            continue
+        texts.append(row[text_column].strip())
+        if label_column is not None:
+            labels.append(normalize_label(row[label_column]) if len(row) > label_column else None)
+
+    return texts, labels if label_column is not None else None
+
+
+def predict(classifier, texts, batch_size):
+    """[(sentiment, confidence)] and the elapsed seconds"""
+    start = time.perf_counter()
+    results = classifier(texts, batch_size=batch_size, truncation=True)
+    elapsed = time.perf_counter() - start
+    return [(LABEL_MAP.get(r['label'], r['label']), r['score']) for r in results], elapsed
+
+
+def accuracy(predictions, labels):
+    scored = [(p[0], gold) for p, gold in zip(predictions, labels) if gold is not None]
+    if not scored:
+        return None
+    return sum(1 for predicted, gold in scored if predicted == gold) / len(scored)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Int8 vs fp32 sentiment model parity check")
+    parser.add_argument("held_out", help="CSV with a review column and optionally a label column")
+    parser.add_argument("--model-path", default="./my_finetuned_sentiment_model")
+    parser.add_argument("--artifact-path", default=None,
+                        help="Quantized artifact (default <model-path>/quantized-int8.pt)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="Minimum share of texts where both models predict the same label")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                        help="Maximum accuracy lost against the labels (if the file has them)")
+    args = parser.parse_args(argv)
+
+    texts, labels = read_held_out(args.held_out)
+    if not texts:
+        print(f"No reviews found in {args.held_out}")
+        return 2
+
+    print(f"Held-out reviews: {len(texts)}")
+
+    fp32, _ = load_sentiment_pipeline(args.model_path)
+    int8, info = load_sentiment_pipeline(args.model_path, quantize=True, artifact_path=args.artifact_path)
+    print(f"Quantized model: {info}")
+
+    fp32_predictions, fp32_seconds = predict(fp32, texts, args.batch_size)
+    int8_predictions, int8_seconds = predict(int8, texts, args.batch_size)
+
+    agreement = sum(
+        1 for a, b in zip(fp32_predictions, int8_predictions) if a[0] == b[0]
+    ) / len(texts)
+    confidence_diff = sum(
+        abs(a[1] - b[1]) for a, b in zip(fp32_predictions, int8_predictions)
+    ) / len(texts)
+
+    print(f"Label agreement:          {agreement * 100:.2f}%")
+    print(f"Mean |confidence delta|:  {confidence_diff:.4f}")
+    print(f"fp32 latency:             {fp32_seconds / len(texts) * 1000:.2f} ms/review")
+    print(f"int8 latency:             {int8_seconds / len(texts) * 1000:.2f} ms/review")
+    print(f"Speedup:                  {fp32_seconds / int8_seconds:.2f}x")
+
+    passed = agreement >= args.min_agreement
+
+    if labels is not None:
+        fp32_accuracy = accuracy(fp32_predictions, labels)
+        int8_accuracy = accuracy(int8_predictions, labels)
+        if fp32_accuracy is not None:
+            print(f"fp32 accuracy:            {fp32_accuracy * 100:.2f}%")
+            print(f"int8 accuracy:            {int8_accuracy * 100:.2f}%")
+            passed = passed and (fp32_accuracy - int8_accuracy) <= args.max_accuracy_drop
+
+    print("PASS" if passed else "FAIL")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
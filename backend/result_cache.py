@@ -0,0 +1,211 @@
+# backend/result_cache.py
+# Content-addressed cache for /predict and /analyze-single results
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class InMemoryCacheBackend:
+    """Per-process LRU store with per-entry expiry"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteCacheBackend:
+    """
+    Local shared store - one SQLite file usable by every worker on the host
+
+    Values are stored as JSON. Once the table grows past max_entries the
+    least recently written rows are dropped.
+    """
+
+    def __init__(self, path="result_cache.sqlite3", max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, written_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_written_at ON results (written_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, written_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY written_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """
+    Cache keyed on a hash of (kind, text, model version, params)
+
+    Repeat requests are answered from the backend without touching the
+    models. The backend is swappable (in-process or SQLite on local disk).
+    The text is hashed exactly as given: cached results carry text_spans
+    taken from it, so texts that differ only in whitespace or Unicode form
+    must not share an entry.
+    """
+
+    def __init__(self, backend=None, ttl_seconds=3600, model_version=""):
+        self.backend = backend or InMemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.model_version = model_version
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def make_key(self, kind: str, text: str, **params) -> str:
+        payload = json.dumps(
+            [kind, self.model_version, text, sorted(params.items())],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, text: str, **params):
+        """Cached result for this input, or None (counted as a hit or a miss)"""
+        try:
+            cached = self.backend.get(self.make_key(kind, text, **params))
+        except Exception as e:
+            print(f"Result cache read error: {e}")
+            cached = None
+
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def put(self, kind: str, text: str, result, **params):
+        """
+        Store a computed result for this input - unless it is marked as a
+        degraded fallback ("fallback": True), which would otherwise be served
+        for the whole TTL
+        """
+        if isinstance(result, dict) and result.get("fallback"):
+            self.skipped += 1
+            return
+
+        try:
+            self.backend.set(self.make_key(kind, text, **params), result, self.ttl_seconds)
+        except Exception as e:
+            print(f"Result cache write error: {e}")
+
+    def get_or_compute(self, kind: str, text: str, compute, **params):
+        """Return the cached result for this input, computing and storing it on a miss"""
+        cached = self.get(kind, text, **params)
+        if cached is not None:
+            return cached
+
+        result = compute()
+        self.put(kind, text, result, **params)
+        return result
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_fallbacks": self.skipped,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_result_cache(model_version: str) -> ResultCache:
+    """
+    Build the result cache from the environment:
+    RESULT_CACHE_BACKEND ('memory' or 'sqlite'), RESULT_CACHE_PATH,
+    RESULT_CACHE_TTL (seconds) and RESULT_CACHE_MAX_ENTRIES
+    """
+    max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+
+    if os.getenv("RESULT_CACHE_BACKEND", "memory").lower() == "sqlite":
+        backend = SqliteCacheBackend(
+            path=os.getenv("RESULT_CACHE_PATH", "result_cache.sqlite3"),
+            max_entries=max_entries
+        )
+    else:
+        backend = InMemoryCacheBackend(max_entries=max_entries)
+
+    return ResultCache(
+        backend=backend,
+        ttl_seconds=int(os.getenv("RESULT_CACHE_TTL", "3600")),
+        model_version=model_version
+    )
@@ -0,0 +1,169 @@
+# backend/review_document.py
+# Per-review preprocessing shared by aspect context and phrase lookups
+
+import re
+from bisect import bisect_right
+
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a fixed set of patterns
+
+    iter_matches() reports every occurrence of every pattern (overlapping
+    ones included) in a single pass over the text.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern in dict.fromkeys(patterns):
+            if pattern:
+                self._add(pattern)
+
+        self._build_failure_links()
+
+    def _add(self, pattern):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """Yield (start, end, pattern) for each occurrence, in order of end position"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern in output[state]:
+                yield index + 1 - len(pattern), index + 1, pattern
+
+
+class ReviewDocument:
+    """
+    A review split once into sentences and tokens
+
+    Holds the lowercased sentences (split on . ! ?) with their offsets, and
+    the whitespace tokens with a lowercased, punctuation-free copy joined
+    into one string with each token's offset. Every aspect of the review is
+    then looked up against these instead of re-splitting and re-lowercasing
+    the text per aspect; locate_phrases() finds all of a review's aspects
+    in one Aho-Corasick pass over the clean tokens.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.text_lower = text.lower()
+
+        # Sentences, split the way context lookup always has
+        self.sentences = text.replace('!', '.').replace('?', '.').split('.')
+        self.sentences_lower = [s.lower() for s in self.sentences]
+
+        # Start offset of each sentence within the '.'-joined lowercase text
+        self.sentence_starts = []
+        offset = 0
+        for sentence in self.sentences_lower:
+            self.sentence_starts.append(offset)
+            offset += len(sentence) + 1
+        self._sentences_joined = '.'.join(self.sentences_lower)
+
+        # Whitespace tokens and their lowercased, punctuation-free forms
+        self.tokens = text.split()
+        self.clean_tokens = [NON_WORD_PATTERN.sub('', token.lower()) for token in self.tokens]
+
+        # Clean tokens joined by spaces, with each token's start offset
+        self.clean_offsets = []
+        offset = 0
+        for token in self.clean_tokens:
+            self.clean_offsets.append(offset)
+            offset += len(token) + 1
+        self._clean_joined = ' '.join(self.clean_tokens)
+
+        # phrase -> every (start, end) token span it was found at
+        self._phrase_spans = {}
+
+    def find_sentence(self, phrase_lower: str):
+        """Index of the first sentence containing phrase_lower, or None"""
+        if '.' in phrase_lower:
+            # Could span a sentence break in the joined text - check each one
+            for index, sentence in enumerate(self.sentences_lower):
+                if phrase_lower in sentence:
+                    return index
+            return None
+
+        position = self._sentences_joined.find(phrase_lower)
+        if position < 0:
+            return None
+        return bisect_right(self.sentence_starts, position) - 1
+
+    def locate_phrases(self, phrases) -> dict:
+        """
+        All token spans of each phrase, found in one pass over the text
+
+        A phrase matches at position i when each of its words appears (as a
+        substring) in the clean tokens i, i+1, ... in order. One automaton
+        is built from the words of every phrase not located yet and run
+        once over the joined clean tokens; matches are then mapped to token
+        positions and chained per phrase. Returns {phrase: [(start, end)]}.
+        """
+        pending = [p for p in dict.fromkeys(phrases) if p not in self._phrase_spans]
+
+        if pending:
+            phrase_words = {phrase: phrase.split() for phrase in pending}
+            matcher = AhoCorasick(word for words in phrase_words.values() for word in words)
+
+            # word -> token positions whose clean token contains it (words
+            # have no spaces, so a match never crosses a token boundary)
+            word_positions = {}
+            for start, _, word in matcher.iter_matches(self._clean_joined):
+                position = bisect_right(self.clean_offsets, start) - 1
+                word_positions.setdefault(word, set()).add(position)
+
+            for phrase, words in phrase_words.items():
+                if not words:
+                    self._phrase_spans[phrase] = [(0, 0)]
+                    continue
+
+                last_start = len(self.clean_tokens) - len(words)
+                self._phrase_spans[phrase] = [
+                    (start, start + len(words))
+                    for start in sorted(word_positions.get(words[0], ()))
+                    if start <= last_start and all(
+                        start + j in word_positions.get(word, ())
+                        for j, word in enumerate(words[1:], 1)
+                    )
+                ]
+
+        return {phrase: self._phrase_spans[phrase] for phrase in phrases}
+
+    def find_phrase(self, phrase_lower: str):
+        """
+        (start, end) token span of the first run of tokens containing each
+        word of phrase_lower in order, or None
+        """
+        spans = self.locate_phrases([phrase_lower])[phrase_lower]
+        return spans[0] if spans else None
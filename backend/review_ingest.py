@@ -0,0 +1,151 @@
+# backend/review_ingest.py
+# Streaming readers for CSV/Excel review uploads
+
+import csv
+import io
+
+# Header names recognised as the review column (case-insensitive)
+POSSIBLE_REVIEW_COLUMNS = ['review', 'review_text', 'text', 'reviews', 'comment', 'feedback']
+
+SUPPORTED_EXTENSIONS = ('csv', 'xlsx', 'xls')
+
+# Read size when counting rows in a CSV upload
+COUNT_CHUNK_BYTES = 1024 * 1024
+
+
+class UnsupportedFileFormat(ValueError):
+    """Raised for uploads that are not CSV or Excel"""
+
+
+def find_review_column(header) -> int:
+    """Index of the review column from the header row alone (first column as fallback)"""
+    for index, name in enumerate(header):
+        if name is not None and str(name).strip().lower() in POSSIBLE_REVIEW_COLUMNS:
+            return index
+    return 0
+
+
+def _clean_cell(value):
+    """Cell value as review text, or None for empty cells"""
+    if value is None:
+        return None
+    text = str(value)
+    return text if text.strip() else None
+
+
+def _iter_csv_rows(binary_file):
+    # utf-8-sig drops the BOM Excel writes at the start of CSV exports
+    text_file = io.TextIOWrapper(binary_file, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        yield from csv.reader(text_file)
+    finally:
+        # Don't let the wrapper close the underlying upload file
+        text_file.detach()
+
+
+def _iter_xlsx_rows(binary_file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(binary_file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_rows(binary_file):
+    # Legacy .xls has no row-streaming reader; fall back to pandas (xlrd)
+    import pandas as pd
+
+    df = pd.read_excel(binary_file, header=None, dtype=object)
+    for row in df.itertuples(index=False):
+        yield [None if pd.isna(value) else value for value in row]
+
+
+def _count_csv_lines(binary_file) -> int:
+    """Line count read in fixed-size chunks (records spanning lines count twice)"""
+    lines = 0
+    binary_file.seek(0)
+    while True:
+        chunk = binary_file.read(COUNT_CHUNK_BYTES)
+        if not chunk:
+            break
+        lines += chunk.count(b'\n')
+    binary_file.seek(0)
+    return lines
+
+
+class ReviewStream:
+    """
+    Iterator over the non-empty reviews of an uploaded file
+
+    Rows are parsed one at a time (CSV reader / openpyxl read-only rows), so
+    memory stays flat regardless of file size. At most `limit` reviews are
+    yielded; `truncated` is set if the file had more. `count` is the number
+    of reviews yielded so far.
+    """
+
+    def __init__(self, binary_file, file_extension, limit=None):
+        file_extension = file_extension.lower()
+        if file_extension not in SUPPORTED_EXTENSIONS:
+            raise UnsupportedFileFormat("Unsupported file format. Please upload CSV or Excel file.")
+
+        self.file_extension = file_extension
+        self.limit = limit
+        self.count = 0
+        self.truncated = False
+
+        # Cheap row estimate for progress reporting (header excluded)
+        if file_extension == 'csv':
+            self.estimated_total = max(_count_csv_lines(binary_file) - 1, 0)
+            rows = _iter_csv_rows(binary_file)
+        elif file_extension == 'xlsx':
+            rows = _iter_xlsx_rows(binary_file)
+            self.estimated_total = None
+        else:
+            rows = _iter_xls_rows(binary_file)
+            self.estimated_total = None
+
+        header = next(rows, None)
+        self.review_column = find_review_column(header or [])
+        self.column_name = header[self.review_column] if header else None
+
+        self._rows = rows
+        self._peeked = []
+
+        if self.estimated_total is not None and limit is not None:
+            self.estimated_total = min(self.estimated_total, limit)
+
+    def _next_review(self):
+        for row in self._rows:
+            if self.review_column < len(row):
+                review = _clean_cell(row[self.review_column])
+                if review is not None:
+                    return review
+        return None
+
+    def has_reviews(self) -> bool:
+        """Whether at least one review remains (reads ahead by one row)"""
+        if not self._peeked:
+            review = self._next_review()
+            if review is None:
+                return False
+            self._peeked.append(review)
+        return True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.limit is not None and self.count >= self.limit:
+            # Only report truncation if there really is another review
+            if not self.truncated and self.has_reviews():
+                self.truncated = True
+            raise StopIteration
+
+        review = self._peeked.pop() if self._peeked else self._next_review()
+        if review is None:
+            raise StopIteration
+
+        self.count += 1
+        return review
@@ -1,7 +1,8 @@
 # backend\sentiment_api.py
 
-from fastapi import FastAPI, Request, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, Request, HTTPException, File, UploadFile, Form, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field
 from transformers import pipeline
 from typing import List, Optional, Dict
@@ -10,8 +11,10 @@ from bson import ObjectId
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-import pandas as pd
-import io
+import tempfile
+import json
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import UploadFile, File
 import base64
 from collections import Counter
@@ -24,8 +27,27 @@ from datetime import datetime, timedelta
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup and shutdown (the hooks are defined next to what they manage)
+    
+    Models load on a background thread so the server binds and serves
+    non-ML endpoints right away; /ready reports when they are usable.
+    """
+    await start_traffic_recorder()
+    start_model_loading()
+    
+    yield
+    
+    shutdown_bulk_jobs()
+    shutdown_bulk_process_pool()
+    shutdown_inference_executor()
+    save_phrase_cache()
+    await stop_traffic_recorder()
+
 # Initialize FastAPI
-app = FastAPI(title="Sentiment Analysis API")
+app = FastAPI(title="Sentiment Analysis API", lifespan=lifespan)
 
 # CORS for Next.js frontend
 app.add_middleware(
@@ -49,37 +71,26 @@ async def track_api_traffic(request: Request, call_next):
     # Calculate processing time
     process_time = time.time() - start_time
     
-    # Record the request (async to not slow down response)
-    try:
-        # Get the hour timestamp
-        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
-        
-        # Increment counter for this hour
-        api_traffic_collection.update_one(
-            {
-                "timestamp": current_hour,
-                "endpoint": request.url.path
-            },
-            {
-                "$inc": {"count": 1},
-                "$set": {"last_updated": datetime.utcnow()},
-                "$push": {
-                    "response_times": {
-                        "$each": [round(process_time * 1000, 2)],  # milliseconds
-                        "$slice": -100  # Keep last 100 response times
-                    }
-                }
-            },
-            upsert=True
-        )
-    except Exception as e:
-        print(f"Traffic tracking error: {e}")
+    # Record the request; the recorder flushes to MongoDB in the background
+    traffic_recorder.record(request.url.path, round(process_time * 1000, 2))  # milliseconds
+    
+    # Label /metrics by route template so path parameters don't add series
+    route = request.scope.get("route")
+    request_metrics.record(
+        request.method,
+        route.path if route is not None else "unmatched",
+        response.status_code,
+        process_time * 1000
+    )
 
     return response
 
 # MongoDB connection
 MONGODB_URI = os.getenv("MONGODB_URI", "YOUR MONGODB URL")
-client = MongoClient(MONGODB_URI)
+# Mongo command latency is collected for /metrics via a command listener
+from mongo_metrics import MongoCommandMetrics
+mongo_metrics = MongoCommandMetrics()
+client = MongoClient(MONGODB_URI, event_listeners=[mongo_metrics])
 db = client["sentiment_db"]
 reviews_collection = db["reviews"]
 corrections_collection = db["corrections"]
@@ -88,13 +99,135 @@ users_collection = db["user-management"]
 api_traffic_collection = db["api_traffic"]
 feedback_collection = db["user_feedback"]
 
-# Load Simplified KeyBERT ABSA System (loads once when server starts)
-print("Loading Simplified KeyBERT ABSA System...")
-from keybert_absa import SimplifiedABSA
+# Request counts/latencies are batched in memory and bulk-written periodically
+from traffic_recorder import create_traffic_recorder
+from metrics import LatencyHistogram, RequestMetrics, PrometheusWriter
+traffic_recorder = create_traffic_recorder(api_traffic_collection)
+
+# Cumulative per-route counts/latency served on /metrics
+request_metrics = RequestMetrics()
+
+async def start_traffic_recorder():
+    """Begin periodic flushing of recorded API traffic"""
+    traffic_recorder.start()
+
+async def stop_traffic_recorder():
+    """Flush traffic still held in memory"""
+    await traffic_recorder.stop()
+
+# All model calls from request handlers run on this bounded pool
+from inference_executor import create_inference_executor, InferenceQueueFull
+inference_executor = create_inference_executor()
+
+def shutdown_inference_executor():
+    """Drop queued inference work so shutdown isn't held up by it"""
+    inference_executor.shutdown()
+
+# Simplified KeyBERT ABSA System - loaded in the background at startup
+# (lifespan); ML endpoints answer 503 until it is ready
+from embedding_cache import get_phrase_cache
+from metrics import StageMetrics
+from inference_runtime import create_server_runtime_profile
+from inference_backend import configured_variant
+from model_loader import ModelLoader
 
 MODEL_PATH = "./my_finetuned_sentiment_model"
-hybrid_analyzer = SimplifiedABSA(sentiment_model_path=MODEL_PATH)
-print("Simplified KeyBERT ABSA System ready!")
+MODEL_VERSION = os.getenv("MODEL_VERSION", "v2.4.1")
+
+# Shared with the analyzer, and available to admin endpoints while it loads.
+# Threads/affinity are applied here, on the main thread, before any model work;
+# with several server workers each takes its own slice of the cores. Unless
+# configured, model calls are capped at the executor's worker count, so
+# background bulk jobs share that limit with request handlers.
+stage_metrics = StageMetrics()
+phrase_cache = get_phrase_cache()
+runtime_profile = create_server_runtime_profile(max_concurrent_calls=inference_executor.max_workers)
+runtime_profile.apply()
+
+hybrid_analyzer = None
+
+def load_models():
+    """Build the ABSA system (the embedder and sentiment model load concurrently)"""
+    global hybrid_analyzer
+    print("Loading Simplified KeyBERT ABSA System...")
+    from keybert_absa import SimplifiedABSA
+    hybrid_analyzer = SimplifiedABSA(
+        sentiment_model_path=MODEL_PATH,
+        phrase_cache=phrase_cache,
+        stage_metrics=stage_metrics,
+        runtime_profile=runtime_profile
+    )
+    print("Simplified KeyBERT ABSA System ready!")
+
+model_loader = ModelLoader(load_models, retry_after=int(os.getenv("MODEL_LOADING_RETRY_AFTER", "10")))
+
+def start_model_loading():
+    """Start loading the models without holding up startup"""
+    model_loader.start()
+
+def require_models():
+    """Dependency for ML endpoints: 503 with Retry-After until the models are loaded"""
+    if not model_loader.ready:
+        failed = model_loader.state == "failed"
+        raise HTTPException(
+            status_code=503,
+            detail="Model loading failed" if failed else "Models are still loading, please retry shortly",
+            headers=None if failed else {"Retry-After": str(model_loader.retry_after)}
+        )
+
+# Repeat texts on /predict and /analyze-single are served from here (keyed
+# by backend and precision too, so results from different runtimes never mix)
+from result_cache import create_result_cache
+result_cache = create_result_cache(model_version=f"{MODEL_VERSION}+{configured_variant()}")
+
+def save_phrase_cache():
+    """Persist phrase embeddings so the next start is warm (if PHRASE_CACHE_PATH is set)"""
+    phrase_cache.save()
+
+# Background bulk analysis jobs (/upload-reviews with background=true)
+from bulk_jobs import create_bulk_job_manager, BulkJobQueueFull
+from review_ingest import ReviewStream, SUPPORTED_EXTENSIONS
+bulk_job_manager = create_bulk_job_manager()
+BACKGROUND_MAX_REVIEWS = int(os.getenv("BACKGROUND_MAX_REVIEWS", "20000"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Streamed /upload-reviews responses (stream=ndjson|sse)
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+def shutdown_bulk_jobs():
+    """Stop picking up queued bulk jobs"""
+    bulk_job_manager.shutdown()
+
+# Optional worker processes for bulk analysis (BULK_PROCESS_WORKERS > 0),
+# each with its own copy of the models and a share of this server worker's cores
+from bulk_workers import create_bulk_process_pool
+bulk_process_pool = create_bulk_process_pool(MODEL_PATH, runtime_profile.cpu_affinity)
+
+def shutdown_bulk_process_pool():
+    """Stop the bulk analysis worker processes"""
+    if bulk_process_pool is not None:
+        bulk_process_pool.shutdown()
+
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full_handler(request: Request, exc: InferenceQueueFull):
+    """Tell clients to back off when the inference queue is at capacity"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Inference queue is full, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(BulkJobQueueFull)
+async def bulk_job_queue_full_handler(request: Request, exc: BulkJobQueueFull):
+    """Tell clients to back off when too many bulk jobs are already waiting"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many bulk analysis jobs are queued, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 # ============================================
 # Pydantic Models (Request/Response schemas)
@@ -184,12 +317,40 @@ class UpdateFeedback(BaseModel):
 # Helper Functions
 # ============================================
 
-def predict_sentiment(text: str) -> dict:
+async def cached_inference(kind: str, text: str, compute, **params):
+    """
+    Result of compute() for text, served from result_cache on the event loop
+    when cached; only a miss is sent to the inference executor (where the
+    result is computed and stored)
+    """
+    cached = result_cache.get(kind, text, **params)
+    if cached is not None:
+        return cached
+    
+    def compute_and_store():
+        result = compute()
+        result_cache.put(kind, text, result, **params)
+        return result
+    
+    return await inference_executor.run(compute_and_store)
+# END: cached_inference - Result cache check before the inference executor
+
+async def predict_sentiment(text: str) -> dict:
     """
     Predict sentiment for a single text using the fine-tuned model
+    (cached by text hash and model version)
+    """
+    return await cached_inference("predict", text, lambda: _predict_sentiment_uncached(text))
+# END: predict_sentiment - Cached single text sentiment prediction
+
+def _predict_sentiment_uncached(text: str) -> dict:
+    """
+    Run the fine-tuned model on a single text
     """
     # Use the sentiment model from SimplifiedABSA
-    result = hybrid_analyzer.sentiment_model(text)[0]
+    with hybrid_analyzer.runtime.model_call(), \
+            hybrid_analyzer.stage_metrics.time("overall_sentiment", tokens=hybrid_analyzer.count_tokens([text])):
+        result = hybrid_analyzer.sentiment_model(text)[0]
     
     # Map labels to readable names
     label_map = {
@@ -205,13 +366,27 @@ def predict_sentiment(text: str) -> dict:
         'confidence': result['score'],
         'raw_label': result['label']
     }
-# END: predict_sentiment - Handles single text sentiment prediction with label mapping
+# END: _predict_sentiment_uncached - Handles single text sentiment prediction with label mapping
+
+async def analyze_review_cached(text: str, top_n: int) -> dict:
+    """
+    Single review ABSA analysis (cached by text hash, model version and top_n)
+    """
+    return await cached_inference(
+        "analyze_single", text,
+        lambda: hybrid_analyzer.analyze_single_review(text, top_n=top_n),
+        top_n=top_n
+    )
+# END: analyze_review_cached - Cached single review ABSA analysis
 
 def predict_batch(texts: List[str]) -> List[dict]:
     """
     Predict sentiment for multiple texts
     """
-    results = hybrid_analyzer.sentiment_model(texts, batch_size=32)
+    with hybrid_analyzer.runtime.model_call(), \
+            hybrid_analyzer.stage_metrics.time("overall_sentiment", batch_size=len(texts),
+                                               tokens=hybrid_analyzer.count_tokens(texts)):
+        results = hybrid_analyzer.sentiment_model(texts, batch_size=32)
     
     label_map = {
         'LABEL_0': 'negative',
@@ -252,6 +427,7 @@ def root():
         "endpoints": [
             "/analyze-single - Analyze single review with 20+ aspects",
             "/upload-reviews - Bulk analysis from CSV/Excel",
+            "/ready - Model loading state (503 until the models are loaded)",
             "/predict - Legacy single sentiment prediction",
             "/batch-predict - Legacy batch prediction",
             "/reviews - Get stored reviews",
@@ -262,13 +438,25 @@ def root():
     }
 # END: root - API welcome endpoint with feature and endpoint listing
 
-@app.post("/predict", response_model=SentimentResponse)
-def predict_single(review: ReviewInput):
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe: 200 once the models are loaded, 503 (with the loading
+    state) before that or if loading failed
+    """
+    status = model_loader.status()
+    if not model_loader.ready:
+        return JSONResponse(status_code=503, content={"ready": False, **status})
+    return {"ready": True, **status}
+# END: readiness - Model loading state for readiness probes
+
+@app.post("/predict", response_model=SentimentResponse, dependencies=[Depends(require_models)])
+async def predict_single(review: ReviewInput):
     """
     Predict sentiment for a single review
     """
     try:
-        result = predict_sentiment(review.text)
+        result = await predict_sentiment(review.text)
         
         return SentimentResponse(
             text=review.text,
@@ -280,30 +468,34 @@ def predict_single(review: ReviewInput):
                 'positive': 0.0
             }
         )
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 # END: predict_single - Single review sentiment prediction endpoint
 
-@app.post("/batch-predict")
-def predict_multiple(batch: BatchReviewInput):
+@app.post("/batch-predict", dependencies=[Depends(require_models)])
+async def predict_multiple(batch: BatchReviewInput):
     """
     Predict sentiment for multiple reviews at once
     """
     try:
-        results = predict_batch(batch.reviews)
+        results = await inference_executor.run(predict_batch, batch.reviews)
         return {"predictions": results, "count": len(results)}
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 # END: predict_multiple - Batch sentiment prediction endpoint
 
-@app.post("/save-review", response_model=ReviewResponse)
-def save_review_with_sentiment(review: ReviewInput):
+@app.post("/save-review", response_model=ReviewResponse, dependencies=[Depends(require_models)])
+async def save_review_with_sentiment(review: ReviewInput):
     """
     Analyze sentiment and save to MongoDB with user email
     """
     try:
         # Predict sentiment
-        result = predict_sentiment(review.text)
+        result = await predict_sentiment(review.text)
         
         # Create document with user_id (email)
         document = {
@@ -316,8 +508,8 @@ def save_review_with_sentiment(review: ReviewInput):
             "raw_label": result['raw_label']
         }
         
-        # Insert into MongoDB
-        insert_result = reviews_collection.insert_one(document)
+        # Insert into MongoDB (off the event loop)
+        insert_result = await asyncio.to_thread(reviews_collection.insert_one, document)
         document['_id'] = str(insert_result.inserted_id)
         
         return ReviewResponse(
@@ -328,11 +520,13 @@ def save_review_with_sentiment(review: ReviewInput):
             timestamp=document['timestamp'].isoformat(),
             user_id=document.get('user_id')
         )
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 # END: save_review_with_sentiment - Analyze and save review to database
 
-@app.post("/analyze-single")
+@app.post("/analyze-single", dependencies=[Depends(require_models)])
 async def analyze_single_with_aspects(review: ReviewInput):
     """
     Analyze single review with Simplified KeyBERT ABSA (20+ aspects)
@@ -340,7 +534,7 @@ async def analyze_single_with_aspects(review: ReviewInput):
     """
     try:
         # Analyze with Simplified KeyBERT ABSA
-        result = hybrid_analyzer.analyze_single_review(review.text, top_n=20)
+        result = await analyze_review_cached(review.text, 20)
         
         # Prepare response
         response_data = {
@@ -367,177 +561,332 @@ async def analyze_single_with_aspects(review: ReviewInput):
                 "timestamp": datetime.utcnow()
             }
             
-            reviews_collection.insert_one(document)
+            await asyncio.to_thread(reviews_collection.insert_one, document)
             response_data["saved"] = True
         
         return response_data
         
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 # END: analyze_single_with_aspects - Single review analysis with aspect extraction
 
-# Replace the upload_reviews_file function in sentiment_api.py (around line 487)
+def delete_bulk_reviews(summary_id):
+    """Remove the individual reviews saved for a bulk summary that was never written"""
+    try:
+        deleted = reviews_collection.delete_many({"bulk_summary_id": str(summary_id)}).deleted_count
+        print(f"Removed {deleted} bulk reviews of unfinished summary {summary_id}")
+    except Exception as db_error:
+        print(f"Database cleanup error for bulk reviews: {str(db_error)}")
+# END: delete_bulk_reviews - Cleanup of reviews from an unfinished bulk upload
+
+def iter_bulk_upload(review_stream, product_name, user_id, file_name, save_to_db,
+                     progress_callback=None):
+    """
+    Analyze uploaded reviews chunk by chunk, saving each chunk as it completes
+    (runs on a worker thread - never call directly from the event loop)
+    
+    review_stream is a ReviewStream; reviews are analyzed as they are parsed.
+    Yields ("results", chunk_results) per analyzed chunk and finally
+    ("summary", response_data) with the aggregated results.
+    """
+    if not review_stream.has_reviews():
+        yield "summary", {
+            "success": False,
+            "error": "No reviews found in the file."
+        }
+        return
+    
+    if progress_callback:
+        progress_callback(0, review_stream.estimated_total)
+    
+    # Analyze all reviews with Simplified KeyBERT ABSA
+    print(f"\n{'='*60}")
+    print(f" BULK ANALYSIS STARTED (KeyBERT)")
+    print(f"{'='*60}")
+    
+    # Individual reviews are saved as their chunk finishes, linked to a
+    # summary id picked up front; the summary itself is saved last. If the
+    # run fails or is abandoned (client disconnect) before then, the
+    # reviews saved so far are deleted again so none point at a summary
+    # that doesn't exist.
+    summary_id = ObjectId() if save_to_db else None
+    saved_reviews = 0
+    aggregated = None
+    
+    try:
+        for kind, payload in hybrid_analyzer.iter_bulk_reviews(
+            review_stream, product_name, top_n=20, progress_callback=progress_callback,
+            process_pool=bulk_process_pool
+        ):
+            if kind == "summary":
+                aggregated = payload
+                continue
+            
+            if save_to_db:
+                bulk_review_docs = []
+                for result in payload:
+                    doc = {
+                        "text": result['text'],
+                        "sentiment": result['overall_sentiment'],
+                        "confidence": result['overall_confidence'],
+                        "aspects": result['aspects'],
+                        "total_aspects_found": result['total_aspects_found'],
+                        "product_id": product_name,  # Use product_name as ID
+                        "user_id": user_id,
+                        "analysis_type": "bulk",
+                        "bulk_summary_id": str(summary_id),  # Link back to summary
+                        "extraction_method": "keybert_absa",
+                        "timestamp": datetime.utcnow()
+                    }
+                    bulk_review_docs.append(doc)
+                
+                if bulk_review_docs:
+                    reviews_collection.insert_many(bulk_review_docs)
+                    saved_reviews += len(bulk_review_docs)
+            
+            yield "results", payload
+    except BaseException:
+        if saved_reviews:
+            delete_bulk_reviews(summary_id)
+        raise
+    
+    total_reviews = review_stream.count
+    truncated = review_stream.truncated
+    
+    # Save to MongoDB if requested
+    if save_to_db:
+        print(f"Saved {saved_reviews} individual bulk reviews")
+        try:
+            summary_doc = {
+                "_id": summary_id,
+                "user_id": user_id,
+                "product_name": product_name,
+                "analysis_type": "bulk",
+                "extraction_method": "keybert_absa",
+                "total_reviews": total_reviews,
+                "file_name": file_name,
+                "aggregated_results": aggregated,
+                "timestamp": datetime.utcnow(),
+                "truncated": truncated
+            }
+            reviews_collection.insert_one(summary_doc)
+            print(f"Saved bulk summary with ID: {summary_id}")
+        except Exception as db_error:
+            print(f"Database save error for summary: {str(db_error)}")
+            delete_bulk_reviews(summary_id)
+    
+    print(f"{'='*60}")
+    print(f"BULK ANALYSIS COMPLETED")
+    print(f"{'='*60}\n")
+    
+    yield "summary", {
+        "success": True,
+        "message": f"Analyzed {total_reviews} reviews successfully with Simplified KeyBERT ABSA",
+        "truncated": truncated,
+        "results": {
+            **aggregated,  # Include all aggregated results
+            "total_analyzed": total_reviews
+        }
+    }
+# END: iter_bulk_upload - Analyze and save a bulk upload chunk by chunk
+
+def run_bulk_analysis(review_stream, product_name, user_id, file_name, save_to_db,
+                      progress_callback=None):
+    """
+    Analyze uploaded reviews, optionally save them, and build the upload response
+    (runs on a worker thread - never call directly from the event loop)
+    """
+    MAX_DISPLAY_REVIEWS = 50  # Only return detailed analysis for first 50
+    
+    # Individual results for display (first 50 reviews); the stream only
+    # yields non-empty reviews, so results line up with reviews one-to-one
+    individual_results = []
+    response_data = None
+    
+    for kind, payload in iter_bulk_upload(review_stream, product_name, user_id, file_name,
+                                          save_to_db, progress_callback=progress_callback):
+        if kind == "results":
+            individual_results.extend(payload[:MAX_DISPLAY_REVIEWS - len(individual_results)])
+        else:
+            response_data = payload
+    
+    if not response_data["success"]:
+        return response_data
+    
+    # Prepare response with enhanced data structure
+    aggregated = response_data["results"]
+    total_analyzed = aggregated.pop("total_analyzed")
+    response_data["results"] = {
+        **aggregated,  # Include all aggregated results
+        "individual_results": individual_results,  # Add individual results
+        "total_analyzed": total_analyzed,
+        "displayed_count": len(individual_results)
+    }
+    
+    return response_data
+# END: run_bulk_analysis - Analyze, save and format a bulk upload
+
+def format_stream_event(event_type, payload, stream_format):
+    """One NDJSON line, or one server-sent event when stream_format is 'sse'"""
+    data = json.dumps({"type": event_type, **payload}, default=str)
+    if stream_format == "sse":
+        return f"event: {event_type}\ndata: {data}\n\n"
+    return data + "\n"
 
-@app.post("/upload-reviews")
+async def stream_bulk_upload(events, stream_format):
+    """
+    Stream a bulk upload as it is analyzed: one "review" event per review as
+    each chunk finishes, then the "summary" event
+    
+    Every chunk is computed on the inference executor; if its queue is full
+    mid-stream we wait Retry-After seconds instead of failing the response.
+    """
+    index = 0
+    
+    try:
+        while True:
+            try:
+                item = await inference_executor.run(next, events, None)
+            except InferenceQueueFull as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            
+            if item is None:
+                break
+            
+            kind, payload = item
+            if kind == "results":
+                for result in payload:
+                    yield format_stream_event("review", {"index": index, **result}, stream_format)
+                    index += 1
+            else:
+                yield format_stream_event("summary", payload, stream_format)
+    except Exception as e:
+        print(f"\nStreaming error: {str(e)}\n")
+        import traceback
+        traceback.print_exc()
+        yield format_stream_event("error", {
+            "success": False,
+            "error": f"Error processing file: {str(e)}"
+        }, stream_format)
+    finally:
+        try:
+            events.close()
+        except ValueError:
+            # Client went away while a chunk is still running on the pool;
+            # the generator cleans up once it is garbage collected
+            pass
+# END: stream_bulk_upload - NDJSON/SSE encoding of a bulk upload
+
+@app.post("/upload-reviews", dependencies=[Depends(require_models)])
 async def upload_reviews_file(
     file: UploadFile = File(...),
     product_name: str = Form(...),
     user_id: str = Form(...),
-    save_to_db: bool = Form(True)
+    save_to_db: bool = Form(True),
+    background: bool = Form(False),
+    stream: Optional[str] = Form(None)
 ):
     """
     Upload CSV/Excel file with reviews and return bulk analysis with individual review details
+    
+    With background=true the analysis runs as a job: the response carries a
+    job_id to poll on /jobs/{job_id}, and the usual response body is served
+    from /jobs/{job_id}/result once it completes.
+    
+    With stream=ndjson (or stream=sse) results are streamed back as each
+    chunk is analyzed: one {"type": "review", ...} event per review, then a
+    {"type": "summary", ...} event with the aggregated results.
     """
     try:
-        # Read file content
-        contents = await file.read()
-        
-        # Determine file type and read accordingly
         file_extension = file.filename.split('.')[-1].lower()
         
-        if file_extension == 'csv':
-            df = pd.read_csv(io.BytesIO(contents))
-        elif file_extension in ['xlsx', 'xls']:
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
+        if file_extension not in SUPPORTED_EXTENSIONS:
             return {
                 "success": False,
                 "error": "Unsupported file format. Please upload CSV or Excel file."
             }
         
-        # Find review column (flexible column names)
-        review_column = None
-        possible_names = ['review', 'review_text', 'text', 'reviews', 'comment', 'feedback']
-        
-        for col in df.columns:
-            if col.lower() in possible_names:
-                review_column = col
-                break
-        
-        if review_column is None:
-            # If no matching column, use first column
-            review_column = df.columns[0]
-        
-        # Extract reviews and clean
-        reviews = df[review_column].dropna().astype(str).tolist()
-        
-        if len(reviews) == 0:
+        stream_format = stream.lower() if stream else None
+        if stream_format and stream_format not in STREAM_MEDIA_TYPES:
             return {
                 "success": False,
-                "error": "No reviews found in the file."
+                "error": "Unsupported stream format. Use 'ndjson' or 'sse'."
             }
         
-        # Limit to prevent overload
-        MAX_REVIEWS = 1000
-        MAX_DISPLAY_REVIEWS = 50  # Only return detailed analysis for first 50
-        truncated = False
-        if len(reviews) > MAX_REVIEWS:
-            reviews = reviews[:MAX_REVIEWS]
-            truncated = True
-        
-        # Analyze all reviews with Simplified KeyBERT ABSA
-        print(f"\n{'='*60}")
-        print(f" BULK ANALYSIS STARTED (KeyBERT)")
-        print(f"{'='*60}")
-        
-        # Get aggregated results
-        aggregated = hybrid_analyzer.analyze_bulk_reviews(reviews, product_name, top_n=20)
-        
-        # Get individual results for display (first 50 reviews)
-        individual_results = []
-        for i, review_text in enumerate(reviews[:MAX_DISPLAY_REVIEWS]):
-            if len(review_text.strip()) > 0:
+        # Limit to prevent overload (background jobs don't hold a request open)
+        MAX_REVIEWS = BACKGROUND_MAX_REVIEWS if background else 1000
+        
+        if background or stream_format:
+            # The upload is closed once this request returns, so copy it
+            # (chunk by chunk) to a file the analysis owns
+            with tempfile.NamedTemporaryFile(suffix=f".{file_extension}", delete=False) as upload_copy:
+                while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                    upload_copy.write(chunk)
+        
+        if stream_format:
+            def upload_events():
                 try:
-                    result = hybrid_analyzer.analyze_single_review(review_text, top_n=5)
-                    individual_results.append({
-                        "text": review_text,
-                        "overall_sentiment": result['overall_sentiment'],
-                        "overall_confidence": result['overall_confidence'],
-                        "aspects": result['aspects'][:5],  # Top 5 aspects per review
-                        "total_aspects_found": result['total_aspects_found']
-                    })
-                except Exception as e:
-                    print(f"Error analyzing review {i+1}: {str(e)}")
-                    # Add a fallback entry
-                    individual_results.append({
-                        "text": review_text,
-                        "overall_sentiment": "neutral",
-                        "overall_confidence": 0.5,
-                        "aspects": [],
-                        "total_aspects_found": 0,
-                        "error": str(e)
-                    })
-        
-        # Save to MongoDB if requested
-        summary_id = None
-        if save_to_db:
-            try:
-                summary_doc = {
-                    "user_id": user_id,
-                    "product_name": product_name,
-                    "analysis_type": "bulk",
-                    "extraction_method": "keybert_absa",
-                    "total_reviews": len(reviews),
-                    "file_name": file.filename,
-                    "aggregated_results": aggregated,
-                    "timestamp": datetime.utcnow(),
-                    "truncated": truncated
-                }
-                summary_result = reviews_collection.insert_one(summary_doc)
-                summary_id = str(summary_result.inserted_id)
-                print(f"Saved bulk summary with ID: {summary_id}")
-            except Exception as db_error:
-                print(f"Database save error for summary: {str(db_error)}")
-        
-        # NEW: Save individual reviews (all, not just first 50)
-        if save_to_db and summary_id:
-            bulk_review_docs = []
-            for i, review_text in enumerate(reviews):  # All reviews
-                if len(review_text.strip()) > 0:
-                    try:
-                        result = hybrid_analyzer.analyze_single_review(review_text, top_n=5)
-                        doc = {
-                            "text": review_text,
-                            "sentiment": result['overall_sentiment'],
-                            "confidence": result['overall_confidence'],
-                            "aspects": result['aspects'],
-                            "total_aspects_found": result['total_aspects_found'],
-                            "product_id": product_name,  # Use product_name as ID
-                            "user_id": user_id,
-                            "analysis_type": "bulk",
-                            "bulk_summary_id": summary_id,  # Link back to summary
-                            "extraction_method": "keybert_absa",
-                            "timestamp": datetime.utcnow()
-                        }
-                        bulk_review_docs.append(doc)
-                    except Exception as e:
-                        print(f"Error saving review {i+1}: {str(e)}")
-                        # Skip or save with fallback (here we skip for simplicity)
-                        pass  # Or add fallback doc if needed
+                    with open(upload_copy.name, "rb") as f:
+                        review_stream = ReviewStream(f, file_extension, limit=MAX_REVIEWS)
+                        yield from iter_bulk_upload(
+                            review_stream, product_name, user_id, file.filename, save_to_db
+                        )
+                finally:
+                    os.remove(upload_copy.name)
             
-            if bulk_review_docs:
-                reviews_collection.insert_many(bulk_review_docs)
-                print(f"Saved {len(bulk_review_docs)} individual bulk reviews")
-        
-        print(f"{'='*60}")
-        print(f"BULK ANALYSIS COMPLETED")
-        print(f"{'='*60}\n")
+            return StreamingResponse(
+                stream_bulk_upload(upload_events(), stream_format),
+                media_type=STREAM_MEDIA_TYPES[stream_format],
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
-        # Prepare response with enhanced data structure
-        response_data = {
-            "success": True,
-            "message": f"Analyzed {len(reviews)} reviews successfully with Simplified KeyBERT ABSA",
-            "truncated": truncated,
-            "results": {
-                **aggregated,  # Include all aggregated results
-                "individual_results": individual_results,  # Add individual results
-                "total_analyzed": len(reviews),
-                "displayed_count": len(individual_results)
+        if background:
+            def run_upload_job(progress_callback):
+                try:
+                    with open(upload_copy.name, "rb") as f:
+                        review_stream = ReviewStream(f, file_extension, limit=MAX_REVIEWS)
+                        return run_bulk_analysis(
+                            review_stream, product_name, user_id, file.filename, save_to_db,
+                            progress_callback=progress_callback
+                        )
+                finally:
+                    os.remove(upload_copy.name)
+            
+            try:
+                job = bulk_job_manager.submit(
+                    run_upload_job,
+                    total=None,
+                    metadata={
+                        "product_name": product_name,
+                        "user_id": user_id,
+                        "file_name": file.filename
+                    }
+                )
+            except BulkJobQueueFull:
+                os.remove(upload_copy.name)
+                raise
+            print(f"Queued bulk analysis job {job.id} ({file.filename})")
+            
+            return {
+                "success": True,
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": f"/jobs/{job.id}",
+                "result_url": f"/jobs/{job.id}/result"
             }
-        }
         
-        return response_data
+        def run_upload():
+            # Stream reviews straight from the spooled upload into the analyzer
+            review_stream = ReviewStream(file.file, file_extension, limit=MAX_REVIEWS)
+            return run_bulk_analysis(review_stream, product_name, user_id, file.filename, save_to_db)
         
+        return await inference_executor.run(run_upload)
+        
+    except (InferenceQueueFull, BulkJobQueueFull):
+        raise
     except Exception as e:
         print(f"\nError: {str(e)}\n")
         import traceback
@@ -548,6 +897,42 @@ async def upload_reviews_file(
         }
 # END: upload_reviews_file - Bulk review analysis with Simplified KeyBERT ABSA
 
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Get progress of a background bulk analysis job (processed/total, throughput, ETA)
+    """
+    job = bulk_job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "success": True,
+        **job.to_dict()
+    }
+# END: get_job_status - Poll background bulk analysis progress
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Get the analysis result of a completed background bulk job
+    """
+    job = bulk_job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status == "failed":
+        return {
+            "success": False,
+            "error": f"Error processing file: {job.error}"
+        }
+    
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, result not ready yet")
+    
+    return job.result
+# END: get_job_result - Fetch result of a completed background bulk job
+
 @app.get("/reviews")
 def get_reviews(
     limit: int = 50, 
@@ -766,7 +1151,7 @@ async def get_admin_stats():
         
         # Placeholder model stats (replace with real logic if you have a model tracking collection)
         current_accuracy = 94  # Or fetch from elsewhere
-        model_version = "v2.4.1"
+        model_version = MODEL_VERSION
         accuracy_change = 2.4
         
         return {
@@ -1502,12 +1887,12 @@ async def get_services_status():
             "icon": "network"
         })
         
-        # ML Engine
+        # ML Engine (sentiment model calls timed in process)
         services.append({
             "name": "ML Engine",
             "status": "operational",
-            "latency": 89,
-            "requests_per_min": 847,
+            "latency": round(stage_metrics.latency("overall_sentiment").mean(), 2),
+            "requests_per_min": stage_metrics.items_per_minute("overall_sentiment"),
             "icon": "brain"
         })
         
@@ -1559,16 +1944,108 @@ async def get_ml_engine_status():
         
         return {
             "success": True,
-            "model_version": "v2.4.1",
+            "model_version": MODEL_VERSION,
             "accuracy": round(avg_confidence * 100, 1),
             "drift_detected": False,
             "predictions_today": predictions_today,
-            "avg_inference_time": 89,  # Track this in production
-            "last_training": "2024-12-09T14:30:00Z"  # Implement actual tracking
+            "avg_inference_time": round(stage_metrics.latency("overall_sentiment").mean(), 2),
+            "stages": stage_metrics.snapshot(),
+            "last_training": "2024-12-09T14:30:00Z",  # Implement actual tracking
+            "models": model_loader.status(),
+            "phrase_cache": phrase_cache.stats(),
+            "aspect_vocabulary": (
+                hybrid_analyzer.aspect_vocabulary.stats()
+                if hybrid_analyzer and hybrid_analyzer.aspect_vocabulary else None
+            ),
+            "result_cache": result_cache.stats(),
+            "inference_queue": inference_executor.stats(),
+            "runtime": runtime_profile.stats(),
+            "sentiment_model": hybrid_analyzer.sentiment_model_info if hybrid_analyzer else None,
+            "bulk_process_pool": bulk_process_pool.stats() if bulk_process_pool else None
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text exposition of in-process counters and histograms
+    (requests, inference queue, ABSA stages, caches, Mongo commands).
+    Nothing here touches the database, so it is cheap to scrape.
+    """
+    writer = PrometheusWriter()
+    
+    # HTTP requests by route template
+    writer.family("api_requests_total", "counter", "HTTP requests by method, route and status code")
+    route_metrics = request_metrics.collect()
+    for method, route, statuses, _ in route_metrics:
+        for status_code, count in statuses.items():
+            writer.sample("api_requests_total", count, {"method": method, "route": route, "status": status_code})
+    
+    writer.family("api_request_duration_seconds", "histogram", "HTTP request latency by method and route")
+    for method, route, _, histogram in route_metrics:
+        writer.histogram("api_request_duration_seconds", histogram, {"method": method, "route": route})
+    
+    # Inference executor
+    queue = inference_executor.stats()
+    writer.family("inference_queue_pending", "gauge", "Model calls running or waiting on the inference pool")
+    writer.sample("inference_queue_pending", queue["pending"])
+    writer.family("inference_queue_capacity", "gauge", "Maximum running plus waiting model calls")
+    writer.sample("inference_queue_capacity", queue["max_workers"] + queue["queue_depth"])
+    writer.family("inference_completed_total", "counter", "Model calls completed on the inference pool")
+    writer.sample("inference_completed_total", queue["completed"])
+    writer.family("inference_rejected_total", "counter", "Model calls rejected because the queue was full")
+    writer.sample("inference_rejected_total", queue["rejected"])
+    
+    writer.family("bulk_jobs", "gauge", "Background bulk analysis jobs by status")
+    for status, count in bulk_job_manager.stats().items():
+        writer.sample("bulk_jobs", count, {"status": status})
+    writer.family("bulk_jobs_rejected_total", "counter", "Bulk jobs rejected because the job queue was full")
+    writer.sample("bulk_jobs_rejected_total", bulk_job_manager.rejected)
+    
+    # ABSA pipeline stages
+    stages = stage_metrics.collect()
+    writer.family("absa_stage_duration_seconds", "histogram", "Latency of one call of an ABSA pipeline stage")
+    for stage, histogram, _, _, _ in stages:
+        writer.histogram("absa_stage_duration_seconds", histogram, {"stage": stage})
+    writer.family("absa_stage_items_total", "counter", "Items (batch sizes summed) processed by an ABSA stage")
+    for stage, _, _, items, _ in stages:
+        writer.sample("absa_stage_items_total", items, {"stage": stage})
+    writer.family("absa_stage_tokens_total", "counter", "Estimated model input tokens (whitespace words) processed by an ABSA stage")
+    for stage, _, _, _, tokens in stages:
+        writer.sample("absa_stage_tokens_total", tokens, {"stage": stage})
+    
+    # Caches
+    writer.family("cache_hits_total", "counter", "Cache lookups answered from the cache")
+    writer.sample("cache_hits_total", phrase_cache.hits, {"cache": "phrase_embedding"})
+    writer.sample("cache_hits_total", result_cache.hits, {"cache": "result"})
+    writer.family("cache_misses_total", "counter", "Cache lookups that had to be computed")
+    writer.sample("cache_misses_total", phrase_cache.misses, {"cache": "phrase_embedding"})
+    writer.sample("cache_misses_total", result_cache.misses, {"cache": "result"})
+    writer.family("phrase_cache_evictions_total", "counter", "Phrase embeddings evicted from the LRU cache")
+    writer.sample("phrase_cache_evictions_total", phrase_cache.evictions)
+    writer.family("phrase_cache_entries", "gauge", "Phrase embeddings held in memory")
+    writer.sample("phrase_cache_entries", len(phrase_cache))
+    
+    # MongoDB commands
+    command_metrics = mongo_metrics.collect()
+    writer.family("mongo_command_duration_seconds", "histogram", "MongoDB command latency by command name")
+    for command, histogram, _ in command_metrics:
+        writer.histogram("mongo_command_duration_seconds", histogram, {"command": command})
+    writer.family("mongo_command_failures_total", "counter", "Failed MongoDB commands by command name")
+    for command, _, failures in command_metrics:
+        writer.sample("mongo_command_failures_total", failures, {"command": command})
+    
+    # Traffic recorder backlog
+    traffic = traffic_recorder.stats()
+    writer.family("traffic_pending_requests", "gauge", "Recorded requests not yet flushed to MongoDB")
+    writer.sample("traffic_pending_requests", traffic["pending_requests"])
+    writer.family("traffic_flush_failures_total", "counter", "Traffic flushes that failed and were re-queued")
+    writer.sample("traffic_flush_failures_total", traffic["failed_flushes"])
+    
+    return PlainTextResponse(writer.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+# END: get_metrics - Prometheus metrics exposition
+
 @app.get("/admin/database-status")
 async def get_database_status():
     """
@@ -1651,49 +2128,53 @@ async def get_admin_stats():
     
 # END: get_admin_stats - Get overall admin statistics for dashboard
 
+def find_traffic_docs(start_time, end_time=None):
+    """Hourly traffic docs from start_time (to end_time) with their latency histograms"""
+    query = {"$gte": start_time}
+    if end_time is not None:
+        query["$lte"] = end_time
+    
+    docs = list(api_traffic_collection.find(
+        {"timestamp": query},
+        {"timestamp": 1, "endpoint": 1, "count": 1, "latency_histogram": 1,
+         "latency_sum_ms": 1, "response_times": 1}
+    ))
+    for doc in docs:
+        doc["histogram"] = LatencyHistogram.from_doc(doc)
+    return docs
+# END: find_traffic_docs - Load hourly traffic docs for a time window
+
 @app.get("/admin/api-traffic")
 async def get_api_traffic(hours: int = 24):
     """
     Get real API traffic data for the last N hours
+    
+    Latency is reported as average and p50/p95/p99 (ms), per hour and over
+    the whole window.
     """
     try:
         # Calculate time range
         end_time = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
         start_time = end_time - timedelta(hours=hours)
         
-        # Aggregate traffic by hour
-        pipeline = [
-            {
-                "$match": {
-                    "timestamp": {"$gte": start_time, "$lte": end_time}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$timestamp",
-                    "total_requests": {"$sum": "$count"},
-                    "unique_endpoints": {"$addToSet": "$endpoint"},
-                    "avg_response_time": {
-                        "$avg": {
-                            "$avg": "$response_times"
-                        }
-                    }
-                }
-            },
-            {
-                "$sort": {"_id": 1}
-            }
-        ]
-        
-        results = list(api_traffic_collection.aggregate(pipeline))
+        # Aggregate traffic by hour, merging the endpoint histograms
+        data_map = {}
+        window_histogram = LatencyHistogram()
+        for doc in find_traffic_docs(start_time, end_time):
+            hour = data_map.setdefault(doc["timestamp"], {
+                "total_requests": 0,
+                "unique_endpoints": set(),
+                "histogram": LatencyHistogram()
+            })
+            hour["total_requests"] += doc.get("count", 0)
+            hour["unique_endpoints"].add(doc["endpoint"])
+            hour["histogram"].merge(doc["histogram"])
+            window_histogram.merge(doc["histogram"])
         
         # Format the data
         traffic_data = []
         current_time = start_time
         
-        # Create a map of existing data
-        data_map = {result["_id"]: result for result in results}
-        
         # Fill in all hours (including zeros for hours with no traffic)
         while current_time <= end_time:
             if current_time in data_map:
@@ -1703,7 +2184,7 @@ async def get_api_traffic(hours: int = 24):
                     "full_timestamp": current_time.isoformat(),
                     "requests": data["total_requests"],
                     "unique_endpoints": len(data["unique_endpoints"]),
-                    "avg_response_time": round(data.get("avg_response_time", 0), 2)
+                    **data["histogram"].summary()
                 })
             else:
                 # No traffic for this hour
@@ -1712,7 +2193,7 @@ async def get_api_traffic(hours: int = 24):
                     "full_timestamp": current_time.isoformat(),
                     "requests": 0,
                     "unique_endpoints": 0,
-                    "avg_response_time": 0
+                    **LatencyHistogram().summary()
                 })
             
             current_time += timedelta(hours=1)
@@ -1726,6 +2207,7 @@ async def get_api_traffic(hours: int = 24):
             "traffic_data": traffic_data,
             "total_requests": total_requests,
             "peak_hour": peak_hour,
+            "latency": window_histogram.summary(),
             "hours_tracked": hours
         }
     except Exception as e:
@@ -1733,46 +2215,32 @@ async def get_api_traffic(hours: int = 24):
 
 
 @app.get("/admin/api-traffic/endpoints")
-async def get_endpoint_traffic(limit: int = 10):
+async def get_endpoint_traffic(limit: int = 10, hours: int = 24):
     """
-    Get traffic breakdown by endpoint
+    Get traffic breakdown by endpoint, with average and p50/p95/p99 latency (ms)
     """
     try:
-        # Get traffic for last 24 hours
-        yesterday = datetime.utcnow() - timedelta(hours=24)
-        
-        pipeline = [
-            {
-                "$match": {
-                    "timestamp": {"$gte": yesterday}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$endpoint",
-                    "total_requests": {"$sum": "$count"},
-                    "avg_response_time": {
-                        "$avg": {"$avg": "$response_times"}
-                    }
-                }
-            },
-            {
-                "$sort": {"total_requests": -1}
-            },
-            {
-                "$limit": limit
-            }
-        ]
+        # Get traffic for the last N hours (24 by default)
+        since = datetime.utcnow() - timedelta(hours=hours)
+        
+        by_endpoint = {}
+        for doc in find_traffic_docs(since):
+            endpoint = by_endpoint.setdefault(doc["endpoint"], {
+                "total_requests": 0,
+                "histogram": LatencyHistogram()
+            })
+            endpoint["total_requests"] += doc.get("count", 0)
+            endpoint["histogram"].merge(doc["histogram"])
         
-        results = list(api_traffic_collection.aggregate(pipeline))
+        results = sorted(by_endpoint.items(), key=lambda item: item[1]["total_requests"], reverse=True)[:limit]
         
         endpoints = [
             {
-                "endpoint": result["_id"],
-                "requests": result["total_requests"],
-                "avg_response_time": round(result.get("avg_response_time", 0), 2)
+                "endpoint": endpoint,
+                "requests": data["total_requests"],
+                **data["histogram"].summary()
             }
-            for result in results
+            for endpoint, data in results
         ]
         
         return {
@@ -2355,34 +2823,17 @@ async def get_performance_metrics():
     Get system performance metrics
     """
     try:
-        # Calculate average response times from recent API traffic
+        # Calculate response time percentiles from recent API traffic
         one_hour_ago = datetime.utcnow() - timedelta(hours=1)
         
-        pipeline = [
-            {
-                "$match": {
-                    "timestamp": {"$gte": one_hour_ago}
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "avg_response_time": {
-                        "$avg": {"$avg": "$response_times"}
-                    },
-                    "total_requests": {"$sum": "$count"}
-                }
-            }
-        ]
-        
-        result = list(api_traffic_collection.aggregate(pipeline))
+        histogram = LatencyHistogram()
+        total_requests = 0
+        for doc in find_traffic_docs(one_hour_ago):
+            histogram.merge(doc["histogram"])
+            total_requests += doc.get("count", 0)
         
-        if result:
-            avg_response = round(result[0].get("avg_response_time", 0), 2)
-            total_requests = result[0].get("total_requests", 0)
-        else:
-            avg_response = 0
-            total_requests = 0
+        latency = histogram.summary()
+        avg_response = latency["avg_response_time"]
         
         # Get database performance
         db_start = time.time()
@@ -2395,9 +2846,13 @@ async def get_performance_metrics():
         return {
             "success": True,
             "avg_response_time_ms": avg_response,
+            "p50_response_time_ms": latency["p50"],
+            "p95_response_time_ms": latency["p95"],
+            "p99_response_time_ms": latency["p99"],
             "db_latency_ms": db_latency,
             "requests_per_minute": requests_per_min,
             "total_requests_last_hour": total_requests,
+            "traffic_recorder": traffic_recorder.stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -0,0 +1,117 @@
+# backend/sentiment_model.py
+# Loads the fine-tuned sentiment pipeline, optionally with int8 dynamic quantization
+
+import hashlib
+import json
+import os
+
+from transformers import pipeline
+
+# Fine-tuned model label ids -> readable sentiment names
+LABEL_MAP = {
+    'LABEL_0': 'negative',
+    'LABEL_1': 'neutral',
+    'LABEL_2': 'positive'
+}
+
+# Files whose contents identify a saved model (weights and config)
+MODEL_FINGERPRINT_FILES = ('config.json', 'model.safetensors', 'pytorch_model.bin')
+
+
+def model_fingerprint(model_path: str) -> str:
+    """Hash of the model's config/weights file names, sizes and mtimes"""
+    digest = hashlib.sha256()
+    for name in MODEL_FINGERPRINT_FILES:
+        file_path = os.path.join(model_path, name)
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def quantize_model(model):
+    """Dynamic int8 quantization of every Linear layer (weights int8, activations quantized per batch)"""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_quantized_model(model_path: str, artifact_path: str):
+    """
+    Quantized model from the state dict at artifact_path if it was built
+    from the current weights with this torch version, otherwise quantize the
+    fp32 model and write the artifact. Returns (model, loaded_from_artifact).
+
+    A cached load builds the int8 module structure from the config alone,
+    so the fp32 weights are never read.
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    meta_path = artifact_path + '.json'
+    expected = {"fingerprint": model_fingerprint(model_path), "torch_version": torch.__version__}
+
+    if os.path.exists(artifact_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta == expected:
+                config = AutoConfig.from_pretrained(model_path)
+                model = quantize_model(AutoModelForSequenceClassification.from_config(config).eval())
+                model.load_state_dict(torch.load(artifact_path))
+                return model, True
+            print("Quantized sentiment model is stale, rebuilding...")
+        except Exception as e:
+            print(f"Could not load quantized sentiment model, rebuilding: {e}")
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+    model = quantize_model(model)
+
+    try:
+        torch.save(model.state_dict(), artifact_path)
+        with open(meta_path, 'w') as f:
+            json.dump(expected, f)
+    except Exception as e:
+        print(f"Could not save quantized sentiment model: {e}")
+
+    return model, False
+
+
+def load_sentiment_pipeline(model_path: str, quantize=False, artifact_path=None):
+    """
+    The "sentiment-analysis" pipeline for model_path, fp32 or int8
+
+    With quantize=True the model's Linear layers are dynamically quantized
+    to int8 (CPU only), loading a cached artifact when one matches the
+    current weights. Returns (pipeline, info) where info describes what was
+    loaded.
+    """
+    if not quantize:
+        return pipeline("sentiment-analysis", model=model_path), {"precision": "fp32"}
+
+    from transformers import AutoTokenizer
+
+    artifact_path = artifact_path or os.path.join(model_path, 'quantized-int8.pt')
+    model, cached = _load_quantized_model(model_path, artifact_path)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+    classifier = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=-1)
+    return classifier, {"precision": "int8-dynamic", "artifact_path": artifact_path, "loaded_from_artifact": cached}
+
+
+def quantize_enabled() -> bool:
+    """SENTIMENT_QUANTIZE=1 selects the int8 sentiment model"""
+    return os.getenv("SENTIMENT_QUANTIZE", "").lower() in ("1", "true", "yes")
+
+
+def create_sentiment_pipeline(model_path: str):
+    """
+    Load the sentiment pipeline per the environment: SENTIMENT_QUANTIZE=1
+    enables int8 dynamic quantization, cached at SENTIMENT_QUANTIZED_PATH
+    (default <model_path>/quantized-int8.pt)
+    """
+    return load_sentiment_pipeline(
+        model_path,
+        quantize=quantize_enabled(),
+        artifact_path=os.getenv("SENTIMENT_QUANTIZED_PATH") or None
+    )
@@ -0,0 +1,169 @@
+# backend/traffic_recorder.py
+# In-memory API traffic aggregation, flushed to MongoDB in bulk
+
+import asyncio
+import os
+import threading
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from metrics import LatencyHistogram, histogram_merge_update
+
+
+class TrafficRecorder:
+    """
+    Accumulates request counts and latency histograms per (hour, endpoint)
+
+    record() only touches an in-process dict; a background task flushes the
+    pending buckets to Mongo with one bulk_write every flush_interval
+    seconds, or sooner once max_pending requests are waiting. Histograms are
+    added into the stored ones server-side. Buckets whose write fails are
+    merged back and retried on the next flush.
+    """
+
+    def __init__(self, collection, flush_interval=10, max_pending=500):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = {}
+        self._pending_requests = 0
+        self._lock = threading.Lock()
+        self._flush_requested = None
+        self._task = None
+
+        self.flushed_requests = 0
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.last_flush_error = None
+
+    def record(self, endpoint: str, response_time_ms: float):
+        """Count one request against the current hour's bucket"""
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+        with self._lock:
+            bucket = self._pending.get((hour, endpoint))
+            if bucket is None:
+                bucket = self._pending[(hour, endpoint)] = {"count": 0, "histogram": LatencyHistogram()}
+
+            bucket["count"] += 1
+            bucket["histogram"].record(response_time_ms)
+
+            self._pending_requests += 1
+            flush_now = self._pending_requests >= self.max_pending
+
+        if flush_now and self._flush_requested is not None:
+            self._flush_requested.set()
+
+    def _requeue(self, buckets):
+        """Merge buckets from a failed write back into the pending ones (lock must be held)"""
+        for key, failed in buckets.items():
+            bucket = self._pending.get(key)
+            if bucket is None:
+                self._pending[key] = failed
+            else:
+                bucket["count"] += failed["count"]
+                bucket["histogram"].merge(failed["histogram"])
+            self._pending_requests += failed["count"]
+
+    def flush(self) -> int:
+        """Write all pending buckets in one bulk_write; returns the requests flushed"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._pending_requests = 0
+
+        if not batch:
+            return 0
+
+        keys = list(batch)
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"timestamp": hour, "endpoint": endpoint},
+                histogram_merge_update(
+                    batch[(hour, endpoint)]["histogram"],
+                    inc={"count": batch[(hour, endpoint)]["count"]},
+                    set_fields={"last_updated": now}
+                ),
+                upsert=True
+            )
+            for hour, endpoint in keys
+        ]
+
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+            failed = {}
+        except BulkWriteError as e:
+            # Only the operations reported as failed were not applied
+            failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+            failed = {keys[i]: batch[keys[i]] for i in failed_indexes}
+            self.last_flush_error = str(e)
+        except Exception as e:
+            failed = batch
+            self.last_flush_error = str(e)
+
+        if failed:
+            self.failed_flushes += 1
+            with self._lock:
+                self._requeue(failed)
+            print(f"Traffic flush error, {len(failed)} buckets kept for retry: {self.last_flush_error}")
+
+        flushed = sum(bucket["count"] for bucket in batch.values()) - sum(bucket["count"] for bucket in failed.values())
+        self.flushed_requests += flushed
+        self.flush_count += 1
+        return flushed
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"Traffic flush error: {e}")
+
+    def start(self):
+        """Start the periodic flush task on the running event loop"""
+        if self._task is None:
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        return {
+            "pending_requests": self._pending_requests,
+            "pending_buckets": len(self._pending),
+            "flushed_requests": self.flushed_requests,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_error": self.last_flush_error
+        }
+
+
+def create_traffic_recorder(collection) -> TrafficRecorder:
+    """
+    Build the recorder from the environment: TRAFFIC_FLUSH_INTERVAL seconds
+    (default 10) and TRAFFIC_FLUSH_MAX_PENDING requests (default 500)
+    """
+    return TrafficRecorder(
+        collection,
+        flush_interval=float(os.getenv("TRAFFIC_FLUSH_INTERVAL", "10")),
+        max_pending=int(os.getenv("TRAFFIC_FLUSH_MAX_PENDING", "500"))
+    )